@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Shared async HTTP client
+Pooled keep-alive connections, bounded concurrency (overall and per
+host) and retry with backoff
+"""
+
+import asyncio
+import json
+import random
+import time
+import weakref
+from collections import deque
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+import instrumentation
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_POOL_LIMIT = 100
+DEFAULT_PER_HOST_LIMIT = 16
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPResponse:
+    """Fully read HTTP response (the connection is already back in the pool)"""
+
+    def __init__(self, status, headers, body, attempts=1):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.attempts = attempts
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header (seconds or HTTP date), None if absent"""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter for the given retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _timeout(value):
+    if value is None or isinstance(value, aiohttp.ClientTimeout):
+        return value
+    return aiohttp.ClientTimeout(total=value, connect=min(value, DEFAULT_CONNECT_TIMEOUT))
+
+
+class HostLimiter:
+    """Counting limiter for requests in flight to one host, resizable while in use
+
+    Unlike a Semaphore, changing ``limit`` keeps the count of requests
+    already in flight, so a new limit never lets more through than it says.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters = deque()
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def __aenter__(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the wait was cancelled
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._wake()
+
+
+def host_key(host_or_url):
+    """Limit key of a URL or host: host plus port, as in the URL's netloc"""
+    return (urlsplit(host_or_url).netloc if "://" in host_or_url else host_or_url).lower()
+
+
+class AsyncHTTPClient:
+    """aiohttp session wrapper shared by every coroutine in a process
+
+    ``limit`` caps open connections overall, ``concurrency`` caps requests
+    in flight, ``per_host`` caps requests in flight to any one host (see
+    limit_host() for per-upstream values), and failed requests (connection
+    errors or a status in RETRY_STATUSES) are retried up to
+    ``max_retries`` times. ``timeout`` (seconds) applies to every request
+    unless a request passes its own.
+    """
+
+    def __init__(self, limit=DEFAULT_POOL_LIMIT, concurrency=None, timeout=DEFAULT_TIMEOUT,
+                 headers=None, max_retries=3, backoff_base=0.5, backoff_max=30.0, per_host=None):
+        self.limit = limit
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.per_host = per_host
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self._host_limits = {}
+        self._host_limiters = {}
+        self._session = None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def closed(self):
+        return self._session is not None and self._session.closed
+
+    def limit_host(self, host_or_url, limit):
+        """Cap requests in flight to one host (a "host:port" or any URL on it)
+
+        Hosts are told apart by host and port, so two services on
+        127.0.0.1 get separate limits. The latest limit applies, also to
+        a host that already has requests in flight; those stay counted.
+        """
+        host = host_key(host_or_url)
+        self._host_limits[host] = limit
+        limiter = self._host_limiters.get(host)
+        if limiter is not None:
+            limiter.set_limit(limit)
+
+    def _host_limiter(self, url):
+        host = host_key(url)
+        limiter = self._host_limiters.get(host)
+        if limiter is None:
+            limit = self._host_limits.get(host, self.per_host)
+            if not limit:
+                return None
+            limiter = self._host_limiters[host] = HostLimiter(limit)
+        return limiter
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=_timeout(self.timeout),
+                headers=self.headers,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _send(self, method, url, **kwargs):
+        session = self._get_session()
+        if "timeout" in kwargs:
+            kwargs["timeout"] = _timeout(kwargs["timeout"])
+        # Wait for the host's slot before taking one of the overall slots,
+        # so a busy host does not hold up requests to the others
+        async with self._host_limiter(url) or nullcontext():
+            async with self._semaphore or nullcontext():
+                if not instrumentation.is_enabled():
+                    async with session.request(method, url, **kwargs) as response:
+                        body = await response.read()
+                        return HTTPResponse(response.status, CIMultiDict(response.headers), body)
+                started = time.perf_counter()
+                status = None
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        body = await response.read()
+                        status = response.status
+                        return HTTPResponse(response.status, CIMultiDict(response.headers), body)
+                finally:
+                    instrumentation.record_http(urlsplit(url).netloc, method, status, time.perf_counter() - started)
+
+    async def request(self, method, url, retry=True, **kwargs):
+        """Send a request and return an HTTPResponse
+
+        Raises the last aiohttp.ClientError / asyncio.TimeoutError if every
+        attempt failed at the connection level.
+        """
+        max_retries = self.max_retries if retry else 0
+
+        for attempt in range(max_retries + 1):
+            try:
+                response = await self._send(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+
+            response.attempts = attempt + 1
+            if response.status not in RETRY_STATUSES or attempt >= max_retries:
+                return response
+
+            delay = retry_after_seconds(response.headers)
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            await asyncio.sleep(min(delay, self.backoff_max))
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+
+# One shared client per event loop, aiohttp sessions cannot cross loops
+_shared_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client():
+    """The process-wide AsyncHTTPClient for the running event loop
+
+    Every module that talks HTTP from a coroutine uses this client, so
+    they share one connection pool and the same per-host limits. Call
+    close_http_client() before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    client = _shared_clients.get(loop)
+    if client is None or client.closed:
+        client = AsyncHTTPClient(per_host=DEFAULT_PER_HOST_LIMIT)
+        _shared_clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    """Close the shared client of the running event loop, if it was created"""
+    client = _shared_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Pool of warm, reusable browser sessions for the shopping agents
+Browsers are started once, keep their Instacart login in a per-slot
+profile, and are recycled after a number of uses or on memory growth
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from browser_use import Browser
+
+import instrumentation
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-shopping", "browser-profiles")
+WARMUP_URL = "https://www.instacart.com/"
+HEALTH_CHECK_TIMEOUT = 10
+
+
+def browser_memory_mb(browser):
+    """Resident memory of a local browser and its child processes, or None"""
+    watchdog = getattr(browser, '_local_browser_watchdog', None)
+    pid = getattr(watchdog, 'browser_pid', None)
+    if not pid:
+        return None
+    try:
+        import psutil  # installed with browser-use
+
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) // (1024 * 1024)
+    except Exception:
+        return None
+
+
+class PooledBrowser:
+    """A browser owned by the pool plus its bookkeeping"""
+
+    def __init__(self, slot, browser):
+        self.slot = slot
+        self.browser = browser
+        self.uses = 0
+        self.started_at = time.time()
+        self.baseline_memory_mb = None
+
+
+class BrowserPool:
+    """Keeps `size` started browsers ready and leases them to shopping runs
+
+    Each slot uses its own persistent profile directory, so the Instacart
+    login from an earlier run is still there for the next one. A browser
+    is replaced when it fails a health check, after `max_uses` leases, or
+    once its memory has grown by `max_memory_growth_mb` since warm-up.
+    """
+
+    def __init__(self, size=2, max_uses=20, max_memory_growth_mb=500, profile_dir=DEFAULT_PROFILE_DIR,
+                 warmup_url=WARMUP_URL):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.profile_dir = profile_dir
+        self.warmup_url = warmup_url
+        self.stats = {"leases": 0, "recycled": 0, "unhealthy": 0}
+        self._idle = asyncio.Queue()
+        self._started = False
+        self._closed = False
+        self._all = set()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Launch and warm every slot"""
+        if self._started:
+            return
+        self._started = True
+        pooled = await asyncio.gather(*(self._launch(slot) for slot in range(self.size)))
+        for entry in pooled:
+            self._idle.put_nowait(entry)
+
+    async def _launch(self, slot):
+        with instrumentation.span("browser_startup", slot=slot):
+            browser = Browser(
+                keep_alive=True,
+                user_data_dir=os.path.join(self.profile_dir, f"slot-{slot}"),
+            )
+            await browser.start()
+            if self.warmup_url:
+                try:
+                    await browser.navigate_to(self.warmup_url)
+                except Exception as e:
+                    print(f"WARNING: Browser slot {slot} warm-up failed: {e}")
+
+        entry = PooledBrowser(slot, browser)
+        entry.baseline_memory_mb = browser_memory_mb(browser)
+        self._all.add(entry)
+        return entry
+
+    async def _dispose(self, entry):
+        self._all.discard(entry)
+        try:
+            await entry.browser.kill()
+        except Exception as e:
+            print(f"WARNING: Failed to stop browser slot {entry.slot}: {e}")
+
+    async def _is_healthy(self, entry):
+        try:
+            await asyncio.wait_for(entry.browser.get_current_page_url(), HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, entry):
+        if entry.uses >= self.max_uses:
+            return True
+        memory = browser_memory_mb(entry.browser)
+        if memory is None or entry.baseline_memory_mb is None:
+            return False
+        return memory - entry.baseline_memory_mb > self.max_memory_growth_mb
+
+    async def _replace(self, entry):
+        await self._dispose(entry)
+        return await self._launch(entry.slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow a healthy browser for the duration of a run"""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._started:
+            await self.start()
+
+        entry = await self._idle.get()
+        try:
+            if not await self._is_healthy(entry):
+                self.stats["unhealthy"] += 1
+                entry = await self._replace(entry)
+
+            self.stats["leases"] += 1
+            entry.uses += 1
+            yield entry.browser
+
+            if self._needs_recycle(entry):
+                self.stats["recycled"] += 1
+                entry = await self._replace(entry)
+        finally:
+            if self._closed:
+                await self._dispose(entry)
+            else:
+                self._idle.put_nowait(entry)
+
+    async def close(self):
+        """Stop every browser owned by the pool"""
+        self._closed = True
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        await asyncio.gather(*(self._dispose(entry) for entry in list(self._all)))
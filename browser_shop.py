@@ -1,13 +1,33 @@
 import asyncio
+import hashlib
 import os
-import requests
 import json
+import time
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any
 
 from pydantic import BaseModel, Field
 
 from browser_use import Agent, Browser, ChatBrowserUse
 
+from async_http import close_http_client, get_http_client
+from cart_checkpoint import CartCheckpoint, checkpoint_path_for
+from grocery_records import CartItem
+from instrumentation import agent_steps, record_agent_run, span
+from item_merge import merge_item_texts
+from list_store import DEFAULT_LIST_ID, get_list_store
+from product_cache import ProductCache, normalize_item_name
+from prompt_builder import (
+	CART_ONLY_INSTRUCTIONS,
+	DEFAULT_TASK_TOKEN_BUDGET,
+	SHOPPING_INSTRUCTIONS,
+	build_checkout_task,
+	build_shopping_tasks,
+	build_single_item_task,
+	log_prompt_cost,
+)
+from sqlite_cache import DEFAULT_CACHE_PATH, SQLiteCache
+
 # Set environment variable to handle Unicode properly
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 os.environ['PYTHONLEGACYWINDOWSSTDIO'] = '1'
@@ -19,6 +39,20 @@ logging.basicConfig(level=logging.WARNING, format='%(message)s')
 # Dedalus API configuration
 DEDALUS_API_KEY = "YOUR_DEDALUS_API_KEY_HERE"
 DEDALUS_BASE_URL = "https://api.dedalus.ai/v1"
+DEDALUS_PLAN_TTL = 24 * 60 * 60
+DEDALUS_PLAN_MAX_ENTRIES = 1000
+DEDALUS_CONCURRENCY = 4
+DEDALUS_RETRY_AFTER = 60  # seconds before a failed probe is tried again
+
+_dedalus_available = None
+_dedalus_checked_at = 0.0
+_plan_cache = None
+_pending_plans = {}
+
+# Parallel shopping configuration
+BROWSER_MEMORY_MB = 600  # Rough footprint of one Chrome instance plus agent
+MAX_BROWSER_WORKERS = 8
+
 
 
 class GroceryItem(BaseModel):
@@ -29,6 +63,7 @@ class GroceryItem(BaseModel):
 	brand: str | None = Field(None, description='Brand name')
 	size: str | None = Field(None, description='Size or quantity')
 	url: str = Field(..., description='Full URL to item')
+	query: str | None = Field(None, description='Shopping list entry this item was picked for')
 
 
 class GroceryCart(BaseModel):
@@ -37,8 +72,41 @@ class GroceryCart(BaseModel):
 	items: list[GroceryItem] = Field(default_factory=list, description='All grocery items found')
 
 
-def connect_to_dedalus_api():
-	"""Test connection to Dedalus API"""
+def cart_records(cart: GroceryCart | None) -> list[CartItem]:
+	"""Convert an agent's GroceryCart into compact CartItem records
+
+	The pydantic models are only needed to talk to the agent; anything
+	that keeps or aggregates many carts should hold CartItems instead.
+	"""
+	return [CartItem.from_item(item) for item in cart.items] if cart else []
+
+
+def dedalus_client():
+	"""Shared async HTTP client, with the Dedalus concurrency limit applied"""
+	client = get_http_client()
+	client.limit_host(DEDALUS_BASE_URL, DEDALUS_CONCURRENCY)
+	return client
+
+
+async def connect_to_dedalus_api(refresh: bool = False):
+	"""Test connection to Dedalus API
+
+	A successful probe is kept for the life of the process, a failed one
+	for DEDALUS_RETRY_AFTER seconds, so a transient error does not turn
+	plans off for good; refresh=True probes again.
+	"""
+	global _dedalus_available, _dedalus_checked_at
+	if not refresh:
+		if _dedalus_available:
+			return True
+		if _dedalus_available is False and time.monotonic() - _dedalus_checked_at < DEDALUS_RETRY_AFTER:
+			return False
+	_dedalus_available = await _probe_dedalus_api()
+	_dedalus_checked_at = time.monotonic()
+	return _dedalus_available
+
+
+async def _probe_dedalus_api():
 	try:
 		headers = {
 			"Authorization": f"Bearer {DEDALUS_API_KEY}",
@@ -46,13 +114,13 @@ def connect_to_dedalus_api():
 		}
 		
 		# Test API connection
-		response = requests.get(f"{DEDALUS_BASE_URL}/models", headers=headers, timeout=10)
+		response = await dedalus_client().get(f"{DEDALUS_BASE_URL}/models", headers=headers, timeout=10, retry=False)
 		
-		if response.status_code == 200:
+		if response.status == 200:
 			print("✅ Successfully connected to Dedalus API")
 			return True
 		else:
-			print(f"❌ Dedalus API connection failed: {response.status_code}")
+			print(f"❌ Dedalus API connection failed: {response.status}")
 			return False
 			
 	except Exception as e:
@@ -60,8 +128,38 @@ def connect_to_dedalus_api():
 		return False
 
 
-def get_dedalus_shopping_plan(items: List[str]) -> Dict[str, Any]:
-	"""Get shopping plan from Dedalus AI"""
+def get_plan_cache():
+	"""Dedalus shopping plans by item set, shared by every run"""
+	global _plan_cache
+	if _plan_cache is None:
+		_plan_cache = SQLiteCache(
+			DEFAULT_CACHE_PATH,
+			table="dedalus_plans",
+			ttl=DEDALUS_PLAN_TTL,
+			max_entries=DEDALUS_PLAN_MAX_ENTRIES,
+		)
+	return _plan_cache
+
+
+def plan_cache_key(items: List[str]) -> str:
+	"""Same key for the same items in any order, case or spacing"""
+	names = sorted({normalize_item_name(item) for item in items})
+	return hashlib.sha256('\n'.join(names).encode('utf-8')).hexdigest()
+
+
+async def get_dedalus_shopping_plan(items: List[str], use_cache: bool = True) -> Dict[str, Any]:
+	"""Get shopping plan from Dedalus AI
+
+	Plans are cached per item set for DEDALUS_PLAN_TTL; a cached plan is
+	returned with "cached": True and no request is made.
+	"""
+	cache = get_plan_cache() if use_cache else None
+	key = plan_cache_key(items)
+	if cache is not None:
+		cached = cache.get(key)
+		if cached is not None:
+			return {"success": True, "plan": cached["plan"], "usage": cached["usage"], "cached": True}
+
 	try:
 		headers = {
 			"Authorization": f"Bearer {DEDALUS_API_KEY}",
@@ -91,24 +189,28 @@ def get_dedalus_shopping_plan(items: List[str]) -> Dict[str, Any]:
 			"temperature": 0.7
 		}
 		
-		response = requests.post(
+		# Not retried: a completion is billed once the request is accepted
+		response = await dedalus_client().post(
 			f"{DEDALUS_BASE_URL}/chat/completions",
 			headers=headers,
 			json=payload,
-			timeout=30
+			timeout=30,
+			retry=False
 		)
 		
-		if response.status_code == 200:
+		if response.status == 200:
 			result = response.json()
-			return {
-				"success": True,
+			plan = {
 				"plan": result["choices"][0]["message"]["content"],
 				"usage": result.get("usage", {})
 			}
+			if cache is not None:
+				cache.set(key, plan)
+			return {"success": True, **plan, "cached": False}
 		else:
 			return {
 				"success": False,
-				"error": f"API request failed: {response.status_code}",
+				"error": f"API request failed: {response.status}",
 				"response": response.text
 			}
 			
@@ -119,104 +221,411 @@ def get_dedalus_shopping_plan(items: List[str]) -> Dict[str, Any]:
 		}
 
 
-def load_grocery_items():
-	"""Load grocery items from the translated shopping list"""
-	try:
-		with open('grocery_list_english.txt', 'r', encoding='utf-8') as file:
-			lines = file.readlines()
-		
-		items = []
-		for line in lines:
-			line = line.strip()
-			if line and not line.startswith('Shopping List') and not line.startswith('Grocery'):
-				# Extract item name (remove numbers and quantities)
-				if '. ' in line:
-					item = line.split('. ', 1)[1]  # Remove numbering
-					if ' - ' in item:
-						item = item.split(' - ')[0]  # Remove quantity
-					if item and item not in ['', ' ']:
-						items.append(item.strip())
-		
-		return items if items else ['milk', 'eggs', 'bread']
-	except FileNotFoundError:
-		print("grocery_list_english.txt not found. Using default items.")
+async def _probe_and_plan(items: List[str]) -> Dict[str, Any]:
+	cached = get_plan_cache().get(plan_cache_key(items))
+	if cached is not None:
+		return {"success": True, "plan": cached["plan"], "usage": cached["usage"], "cached": True}
+	with span("dedalus_plan", items=len(items)):
+		if not await connect_to_dedalus_api():
+			return {"success": False, "error": "Dedalus API not available"}
+		return await get_dedalus_shopping_plan(items)
+
+
+async def fetch_dedalus_plan(items: List[str]) -> Dict[str, Any]:
+	"""Probe Dedalus and get the plan, as a task that can run next to the browser
+
+	Concurrent calls for the same item set share one request.
+	"""
+	key = plan_cache_key(items)
+	task = _pending_plans.get(key)
+	if task is None:
+		task = asyncio.ensure_future(_probe_and_plan(items))
+		_pending_plans[key] = task
+		task.add_done_callback(lambda _: _pending_plans.pop(key, None))
+	return await asyncio.shield(task)
+
+
+def print_dedalus_plan(task: asyncio.Task) -> None:
+	"""Done-callback that reports a fetch_dedalus_plan task"""
+	if task.cancelled():
+		return
+	if task.exception() is not None:
+		print(f"❌ Dedalus plan failed: {task.exception()}")
+		return
+	plan = task.result()
+	if plan["success"]:
+		source = "from cache" if plan.get("cached") else "received"
+		print(f"✅ Dedalus AI shopping plan {source}:")
+		print(plan["plan"])
+	else:
+		print(f"⚠️  Dedalus plan unavailable ({plan['error']}), proceeding with browser automation only")
+
+
+def load_grocery_items(list_id=DEFAULT_LIST_ID, run_id=None):
+	"""Load grocery items from the translated shopping list in the list store"""
+	# Item names only, quantities and notes are dropped
+	items = [record.name for record in get_list_store().load_items(list_id, run_id) if record.name]
+	if not items:
+		print(f"No stored items for list '{list_id}'. Using default items.")
 		return ['milk', 'eggs', 'bread']
+	return items
+
+
+_llm = None
+_product_cache = None
+
+
+def get_llm():
+	"""Browser Use chat client shared by every agent in the process"""
+	global _llm
+	if _llm is None:
+		_llm = ChatBrowserUse(api_key="YOUR_BROWSER_USE_API_KEY_HERE")
+	return _llm
+
+
+def get_product_cache():
+	"""Product resolution cache shared by every run in the process"""
+	global _product_cache
+	if _product_cache is None:
+		_product_cache = ProductCache()
+	return _product_cache
+
+
+def split_known_items(items: list[str], use_cache: bool = True):
+	"""Split items into (to_search, known) using the product cache"""
+	known = get_product_cache().lookup(items) if use_cache else {}
+	return [item for item in items if item not in known], known
+
+
+def merge_duplicate_items(items: list[str]) -> list[str]:
+	"""Collapse entries naming the same product, adding up their quantities"""
+	items = items or []
+	merged = merge_item_texts(items)
+	if len(merged) < len(items):
+		print(f"🔁 Merged {len(items) - len(merged)} duplicate items ({len(merged)} left to shop)")
+	return merged
 
-async def add_to_cart(items: list[str] = None):
-	# Test Dedalus API connection first
-	print("🔗 Testing Dedalus API connection...")
-	if not connect_to_dedalus_api():
-		print("⚠️  Dedalus API not available, proceeding with browser automation only")
+
+def remember_products(cart) -> None:
+	"""Store the products an agent resolved so the next run can skip the search"""
+	if cart and cart.items:
+		get_product_cache().remember([item.model_dump() for item in cart.items])
+
+
+def agent_succeeded(result) -> bool:
+	"""True if an agent run finished and reported success
+
+	A failed or abandoned run returns its history instead of raising.
+	"""
+	return bool(result) and result.is_done() and result.is_successful() is True
+
+
+@asynccontextmanager
+async def browser_session(pool=None, keep_alive=False):
+	"""Lease a warm browser from `pool`, or start a fresh one without a pool
+
+	keep_alive keeps a fresh browser open across several agents; it is
+	killed when the block exits.
+	"""
+	if pool is None:
+		browser = Browser(keep_alive=True) if keep_alive else Browser()
+		try:
+			yield browser
+		finally:
+			if keep_alive:
+				await browser.kill()
 	else:
-		print("🤖 Getting AI shopping plan from Dedalus...")
-		dedalus_plan = get_dedalus_shopping_plan(items)
-		if dedalus_plan["success"]:
-			print("✅ Dedalus AI shopping plan received:")
-			print(dedalus_plan["plan"])
-		else:
-			print(f"❌ Dedalus plan failed: {dedalus_plan['error']}")
-
-	browser = Browser()
-
-	llm = ChatBrowserUse(api_key="YOUR_BROWSER_USE_API_KEY_HERE")
-
-	# Task prompt
-	task = f"""
-    Search for "{items}" on Instacart, add to cart, and proceed to checkout with payment.
-
-    Steps:
-    1. Go to https://www.instacart.com/
-    2. search for each item and add to cart:
-       - Search for the item
-       - Find the best match (closest name, lowest price)
-       - Click on the product to view details
-       - Click the "Add to cart" button
-       - Clear search box/field
-       - Continue to next item
-    3. After adding all items, proceed to checkout:
-       - Click on the cart icon
-       - Review items in cart
-       - Click "Checkout" or "Proceed to checkout"
-    4. Go through checkout process:
-       - Select delivery/pickup option
-       - Proceed to payment section
-       - Click "Add payment method" or "Add card"
-       - Fill in card details (use test card: 4111 1111 1111 1111)
-       - Add card to account
-
-    IMPORTANT: 
-    - You MUST login first before shopping
-    - You MUST click the "Add to cart" button for each item
-    - Complete the entire checkout process up to adding a payment card
-    - Do not stop after adding items - continue to payment
-    - Look for "Add to cart", "Checkout", "Add payment method" buttons
-    - Clear the search box/field after adding each item
-
-    Site:
-    - Instacart: https://www.instacart.com/
-    """
-
-	# Create agent with structured output
-	agent = Agent(
-		browser=browser,
-		llm=llm,
-		task=task,
-		output_model_schema=GroceryCart,
-		instructions="You are a helpful shopping assistant for Instacart. You MUST: 1) Login first with the provided credentials, 2) Add each item to cart, 3) Clear the search after each item, 4) Proceed to checkout, 5) Go through payment setup, 6) Add a payment card. IMPORTANT: Login first, then clear the search box/field after adding each item to cart before searching for the next item. Do not stop until you reach the payment card addition step.",
-	)
+		async with pool.lease() as browser:
+			yield browser
+
 
-	# Run the agent with better error handling
+def available_memory_mb():
+	"""Available system memory in MB, or None if it cannot be read"""
 	try:
-		result = await agent.run()
+		with open('/proc/meminfo', 'r', encoding='utf-8') as file:
+			for line in file:
+				if line.startswith('MemAvailable:'):
+					return int(line.split()[1]) // 1024
+	except OSError:
+		pass
+	try:
+		return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+	except (ValueError, OSError, AttributeError):
+		return None
+
+
+def default_worker_count():
+	"""Browser worker pool size that fits the CPUs and free memory"""
+	cpus = os.cpu_count() or 1
+	memory = available_memory_mb()
+	by_memory = max(1, memory // BROWSER_MEMORY_MB) if memory else cpus
+	return max(1, min(cpus, by_memory, MAX_BROWSER_WORKERS))
+
+
+def shard_items(items: list[str], shards: int) -> list[list[str]]:
+	"""Split items round-robin into at most `shards` non-empty groups"""
+	shards = max(1, min(shards, len(items)))
+	return [items[i::shards] for i in range(shards)]
+
+
+class ParallelCartResult(BaseModel):
+	"""Merged outcome of a parallel shopping run"""
+
+	structured_output: GroceryCart | None = None
+	errors: list[str] = Field(default_factory=list)
+
+
+async def _run_recorded(agent, label: str, items: int):
+	"""agent.run() in an agent_run span, its steps recorded even when it raises"""
+	result = None
+	try:
+		with span("agent_run", agent=label):
+			result = await agent.run()
 		return result
+	finally:
+		record_agent_run(label, agent_steps(result if result is not None else agent.history), items)
+
+
+class ShoppingWorkerError(RuntimeError):
+	"""A shopping worker failed part way; `cart` holds what earlier tasks already added"""
+
+	def __init__(self, message: str, cart: GroceryCart):
+		super().__init__(message)
+		self.cart = cart
+
+
+def partial_cart(error: BaseException) -> GroceryCart | None:
+	"""Items a failed worker had already put in the cart, if any"""
+	cart = getattr(error, 'cart', None)
+	return cart if cart is not None and cart.items else None
+
+
+async def _run_shopping_worker(
+	tasks: list[str],
+	llm,
+	label: str,
+	pool=None,
+	item_count: int = 0,
+	instructions: str = SHOPPING_INSTRUCTIONS,
+):
+	"""Run one agent per task in the same browser, returns the merged GroceryCart
+
+	Raises ShoppingWorkerError carrying the items added by the tasks
+	that finished before the failure.
+	"""
+	cart = GroceryCart()
+	steps = 0
+	try:
+		async with browser_session(pool, keep_alive=len(tasks) > 1) as browser:
+			for task in tasks:
+				agent = Agent(
+					browser=browser,
+					llm=llm,
+					task=task,
+					output_model_schema=GroceryCart,
+					instructions=instructions,
+				)
+				result = None
+				try:
+					with span("agent_run", agent=label):
+						result = await agent.run()
+				finally:
+					# A run that raised still took steps, read them from its history
+					steps += agent_steps(result if result is not None else agent.history)
+				if not result or not result.structured_output:
+					raise RuntimeError(f'{label} finished without structured output')
+				cart.items.extend(result.structured_output.items)
+	except Exception as e:
+		raise ShoppingWorkerError(str(e), cart) from e
+	finally:
+		# Failed runs are recorded too, they are the ones worth diagnosing
+		record_agent_run(label, steps, item_count)
+	return cart
+
+
+async def add_to_cart_parallel(
+	items: list[str],
+	workers: int | None = None,
+	pool=None,
+	known: dict | None = None,
+	token_budget: int = DEFAULT_TASK_TOKEN_BUDGET,
+):
+	"""Fill the cart with a pool of concurrent browser agents, then check out
+
+	Items are sharded across `workers` browsers (default: sized from CPU
+	count and free memory, or the BrowserPool size when one is given).
+	A shard whose prompt would exceed token_budget runs as several
+	tasks in a row. Once every shard is done, one more agent runs
+	checkout. Shard workers get CART_ONLY_INSTRUCTIONS, so none of them
+	checks out a cart the others are still filling. Returns a
+	ParallelCartResult with the merged GroceryCart.
+	"""
+	items = items or []
+	workers = workers or (pool.size if pool is not None else default_worker_count())
+	shards = shard_items(items, workers)
+	print(f"🛒 Shopping {len(items)} items with {len(shards)} parallel browser workers")
+
+	llm = get_llm()
+	shard_tasks = [build_shopping_tasks(shard, known, checkout=False, budget=token_budget) for shard in shards]
+	log_prompt_cost([task for tasks in shard_tasks for task in tasks] + [build_checkout_task()], len(items))
+
+	results = await asyncio.gather(
+		*(
+			_run_shopping_worker(tasks, llm, f'Worker {n}', pool, len(shard), CART_ONLY_INSTRUCTIONS)
+			for n, (shard, tasks) in enumerate(zip(shards, shard_tasks), 1)
+		),
+		return_exceptions=True,
+	)
+
+	cart = GroceryCart()
+	errors = []
+	for n, result in enumerate(results, 1):
+		if isinstance(result, BaseException):
+			errors.append(f'Worker {n}: {result}')
+			print(f"Browser automation error in worker {n}: {result}")
+			partial = partial_cart(result)
+			if partial is not None:
+				cart.items.extend(partial.items)
+		else:
+			cart.items.extend(result.items)
+	remember_products(cart)
+
+	if cart.items:
+		try:
+			await _run_shopping_worker([build_checkout_task()], llm, 'Checkout worker', pool)
+		except Exception as e:
+			errors.append(f'Checkout: {e}')
+			print(f"Browser automation error during checkout: {e}")
+
+	return ParallelCartResult(structured_output=cart if cart.items else None, errors=errors)
+
+
+async def stream_add_to_cart(
+	items: list[str],
+	checkpoint_path: str | None = None,
+	pool=None,
+	checkout: bool = True,
+	use_product_cache: bool = True,
+):
+	"""Add items one at a time, yielding each GroceryItem as soon as it is in the cart
+
+	Every finished item is appended to the checkpoint file, by default one
+	per item list under cart_progress/. Running again with the same list
+	(or checkpoint_path) yields the items recorded there, then
+	continues with the rest, so work done before a crash is not repeated.
+	After the last item the checkout agent runs (unless checkout=False);
+	the checkpoint is removed only if checkout reports success.
+	"""
+	items = merge_duplicate_items(items)
+	checkpoint = CartCheckpoint(checkpoint_path or checkpoint_path_for(items))
+	done = checkpoint.load()
+	finished = [(item, done.get(normalize_item_name(item))) for item in items]
+	remaining = [item for item, product in finished if product is None]
+
+	if len(remaining) < len(items):
+		print(f"♻️  Resuming: {len(items) - len(remaining)} items already in the cart")
+	for item, product in finished:
+		if product is not None:
+			yield GroceryItem(**product)
+
+	_, known = split_known_items(remaining, use_product_cache)
+	tasks = {item: build_single_item_task(item, known.get(item)) for item in remaining}
+	log_prompt_cost(list(tasks.values()) + [build_checkout_task()], len(remaining))
+	llm = get_llm()
+	failed = []
+
+	async with browser_session(pool, keep_alive=True) as browser:
+		for item in remaining:
+			agent = Agent(
+				browser=browser,
+				llm=llm,
+				task=tasks[item],
+				output_model_schema=GroceryItem,
+				instructions=CART_ONLY_INSTRUCTIONS,
+			)
+			try:
+				result = await _run_recorded(agent, "Item agent", 1)
+			except Exception as e:
+				print(f"Browser automation error for {item}: {e}")
+				failed.append(item)
+				continue
+
+			grocery_item = result.structured_output if result else None
+			if grocery_item is None:
+				print(f"No result for {item}, it will be retried on the next run")
+				failed.append(item)
+				continue
+
+			grocery_item.query = grocery_item.query or item
+			product = grocery_item.model_dump()
+			checkpoint.record(item, product)
+			get_product_cache().remember([product])
+			yield grocery_item
+
+		if checkout and not failed:
+			checkout_agent = Agent(
+				browser=browser,
+				llm=llm,
+				task=build_checkout_task(),
+				instructions=SHOPPING_INSTRUCTIONS,
+			)
+			try:
+				result = await _run_recorded(checkout_agent, "Checkout agent", 0)
+			except Exception as e:
+				print(f"Browser automation error during checkout: {e}")
+			else:
+				if agent_succeeded(result):
+					checkpoint.clear()
+				else:
+					print("Checkout did not finish, progress is kept for the next run")
+
+
+async def add_to_cart(
+	items: list[str] = None,
+	workers: int | None = 1,
+	pool=None,
+	use_product_cache: bool = True,
+	token_budget: int = DEFAULT_TASK_TOKEN_BUDGET,
+):
+	"""Add items to the Instacart cart and check out
+
+	With workers=1 a single agent does everything; any other value (None
+	for automatic sizing) shards the items across parallel browsers. Pass
+	a browser_pool.BrowserPool to reuse warm, logged-in browsers. Items
+	resolved on an earlier run open their cached product page directly.
+	Duplicate items are merged first, so each product is searched once.
+	Lists whose prompt would exceed token_budget are split into several
+	tasks run one after another in the same browser; if a later task
+	fails, the result still holds the items the earlier ones added.
+	"""
+	items = merge_duplicate_items(items)
+
+	# The Dedalus plan is only advisory, fetch it while the browser starts
+	print("🤖 Getting AI shopping plan from Dedalus in the background...")
+	plan_task = asyncio.ensure_future(fetch_dedalus_plan(items))
+	plan_task.add_done_callback(print_dedalus_plan)
+
+	_, known = split_known_items(items, use_product_cache)
+	if known:
+		print(f"📦 {len(known)} items resolved from the product cache, skipping their search")
+
+	if workers != 1 and len(items) > 1:
+		return await add_to_cart_parallel(items, workers, pool, known, token_budget)
+
+	llm = get_llm()
+	tasks = build_shopping_tasks(items, known, checkout=True, budget=token_budget)
+	log_prompt_cost(tasks, len(items))
+
+	try:
+		cart = await _run_shopping_worker(tasks, llm, 'Shopping agent', pool, len(items))
 	except Exception as e:
 		print(f"Browser automation error: {e}")
-		# Try to return a basic result structure
-		from pydantic import BaseModel
-		class ErrorResult(BaseModel):
-			structured_output = None
-			error = str(e)
-		return ErrorResult()
+		# Items from the chunks that finished are in the Instacart cart already
+		cart = partial_cart(e)
+		remember_products(cart)
+		return ParallelCartResult(structured_output=cart, errors=[str(e)])
+	remember_products(cart)
+	return ParallelCartResult(structured_output=cart if cart.items else None)
 
 
 if __name__ == '__main__':
@@ -227,7 +636,13 @@ if __name__ == '__main__':
 		print(f'{i}. {item}')
 	print()
 
-	result = asyncio.run(add_to_cart(items))
+	async def main():
+		try:
+			return await add_to_cart(items)
+		finally:
+			await close_http_client()
+
+	result = asyncio.run(main())
 
 	# Access structured output
 	if result and result.structured_output:
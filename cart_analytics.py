@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Vectorized analytics over many shopping carts
+Loads carts into NumPy columns and computes totals, per-brand and per-size
+spend, price per unit and week-over-week price changes without Python
+loops over items
+"""
+
+import re
+
+import numpy as np
+
+from grocery_parser import grocery_line_from_parts
+from grocery_records import CartBatch
+from units import to_base
+
+_FLUID_OUNCE = re.compile(r'\bfl\.?\s*oz\b', re.IGNORECASE)
+_MULTIPACK = re.compile(r'^\s*(\d+)\s*[x×]\s*(.+)$', re.IGNORECASE)
+
+
+def parse_size(size):
+    """Turn a product size like "1 gal", "12 oz" or "6 x 330 ml" into (dimension, base amount)"""
+    if not size:
+        return None
+    size = _FLUID_OUNCE.sub('floz', size)
+    multiplier = 1
+    multipack = _MULTIPACK.match(size)
+    if multipack:
+        multiplier = int(multipack.group(1))
+        size = multipack.group(2)
+    record = grocery_line_from_parts('', size)
+    base = to_base(record.quantity, record.unit)
+    if base is None:
+        return None
+    return base[0], base[1] * multiplier
+
+
+def _encode(values):
+    """Factorize a list of strings (None allowed) into (labels, codes)"""
+    labels, codes = np.unique(np.array([value or '' for value in values], dtype=object), return_inverse=True)
+    return labels, codes.astype(np.intp)
+
+
+class CartAnalytics:
+    """NumPy columns for a batch of carts
+
+    Build with from_carts() or from_batch(). ``weeks`` gives each cart an
+    integer period for week-over-week deltas: a running week index by
+    default, or any evenly spaced integers with the spacing passed as
+    week_over_week_deltas(step=...), e.g. day numbers with step=7.
+    """
+
+    def __init__(self, batch, weeks=None):
+        self.cart_ids = list(batch.cart_ids)
+        self.cart_index = np.frombuffer(batch.cart_index, dtype=np.uint32).astype(np.intp)
+        self.prices = np.frombuffer(batch.prices, dtype=np.float64).copy()
+        self.names, self.name_codes = _encode(batch.names)
+        self.brands, self.brand_codes = _encode(batch.brands)
+        self.sizes, self.size_codes = _encode(batch.sizes)
+
+        # Parse each distinct size once, then broadcast to every row
+        parsed = [parse_size(size) for size in self.sizes]
+        size_amounts = np.array([p[1] if p else np.nan for p in parsed], dtype=np.float64)
+        self.size_dimensions = np.array([p[0] if p else '' for p in parsed], dtype=object)
+        self.amounts = size_amounts[self.size_codes] if len(self.sizes) else np.empty(0)
+
+        if weeks is None:
+            self.cart_weeks = np.zeros(len(self.cart_ids), dtype=np.int64)
+        else:
+            self.cart_weeks = np.array([weeks[cart_id] for cart_id in self.cart_ids], dtype=np.int64)
+
+    @classmethod
+    def from_batch(cls, batch, weeks=None):
+        return cls(batch, weeks)
+
+    @classmethod
+    def from_carts(cls, carts, weeks=None):
+        """Load (cart_id, cart) pairs; carts can be GroceryCarts or item lists"""
+        batch = CartBatch()
+        for cart_id, cart in carts:
+            batch.add_cart(cart_id, cart)
+        return cls(batch, weeks)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def cart_totals(self):
+        """{cart_id: total spend}"""
+        totals = np.bincount(self.cart_index, weights=self.prices, minlength=len(self.cart_ids))
+        return dict(zip(self.cart_ids, totals.tolist()))
+
+    def grand_total(self):
+        return float(self.prices.sum())
+
+    def _spend_by(self, labels, codes):
+        spend = np.bincount(codes, weights=self.prices, minlength=len(labels))
+        order = np.argsort(-spend, kind='stable')
+        return {(labels[i] or None): float(spend[i]) for i in order}
+
+    def spend_by_brand(self):
+        """{brand: spend}, highest first; items without a brand are under None"""
+        return self._spend_by(self.brands, self.brand_codes)
+
+    def spend_by_size(self):
+        """{size: spend}, highest first"""
+        return self._spend_by(self.sizes, self.size_codes)
+
+    def price_per_unit(self):
+        """Per-row price per base unit (per ml, g or item); NaN when the size is unknown"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.prices / self.amounts
+
+    def unit_dimensions(self):
+        """Per-row dimension of price_per_unit ("volume", "mass", "count", a package such as "loaf", or "")"""
+        return self.size_dimensions[self.size_codes] if len(self.sizes) else np.empty(0, dtype=object)
+
+    def weekly_prices(self):
+        """Mean price per (item name, week) as a matrix with NaN where unseen
+
+        Returns (week labels, price matrix) with one row per entry in self.names.
+        """
+        week_labels, week_codes = np.unique(self.cart_weeks, return_inverse=True)
+        row_weeks = week_codes[self.cart_index]
+        cells = self.name_codes * len(week_labels) + row_weeks
+        size = len(self.names) * len(week_labels)
+
+        sums = np.bincount(cells, weights=self.prices, minlength=size)
+        counts = np.bincount(cells, minlength=size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return week_labels, means.reshape(len(self.names), len(week_labels))
+
+    def week_over_week_deltas(self, step=1):
+        """{item name: [(week, price change vs the previous week)]}
+
+        The previous week is the label ``step`` lower. Only weeks where the
+        item was bought in both that week and the previous one are
+        reported; a gap in the observed weeks is not bridged. step=None
+        compares each week with the previous observed one, whatever the
+        gap (use it for labels that are ordered but not evenly spaced,
+        such as YYYYWW across a year boundary).
+        """
+        week_labels, prices = self.weekly_prices()
+        if len(week_labels) < 2:
+            return {}
+        deltas = np.diff(prices, axis=1)
+        valid = ~np.isnan(deltas)
+        if step is not None:
+            valid &= np.diff(week_labels) == step
+        rows, columns = np.nonzero(valid)
+
+        result = {}
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            result.setdefault(self.names[row], []).append(
+                (int(week_labels[column + 1]), float(deltas[row, column]))
+            )
+        return result
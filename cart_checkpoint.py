@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+On-disk progress log for cart filling runs
+Each added item is appended as one JSON line so a crashed run can resume
+"""
+
+import hashlib
+import json
+import os
+
+from product_cache import normalize_item_name
+
+DEFAULT_CHECKPOINT_DIR = "cart_progress"
+
+
+def checkpoint_path_for(items, directory=DEFAULT_CHECKPOINT_DIR):
+    """Checkpoint file for one item list, the same for any order, case or spacing
+
+    Each list gets its own file, so a run never resumes from another
+    list's progress.
+    """
+    names = sorted({normalize_item_name(item) for item in items})
+    digest = hashlib.sha256('\n'.join(names).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, f"{digest}.jsonl")
+
+
+class CartCheckpoint:
+    """Append-only JSON lines file of the items already in the cart"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Return {normalized item: product dict} for every recorded item
+
+        A crash mid-write leaves a partial last line; it is cut off here so
+        the next record() starts on a clean line.
+        """
+        done = {}
+        try:
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                good = data.rfind(b'\n') + 1
+                if good < len(data):
+                    f.truncate(good)
+        except FileNotFoundError:
+            return done
+        for line in data[:good].decode('utf-8', errors='replace').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            done[normalize_item_name(record['item'])] = record['product']
+        return done
+
+    def record(self, item, product):
+        """Durably append one finished item"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'item': item, 'product': product}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        """Remove the checkpoint once the run has finished"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -16,8 +16,26 @@ os.environ['PYTHONLEGACYWINDOWSSTDIO'] = '1'
 import logging
 logging.basicConfig(level=logging.WARNING, format='%(message)s')
 
-async def run_google_docs_shopping_final():
-    """Run the final Google Docs shopping system"""
+# Your Google Docs URL
+GOOGLE_DOCS_URL = "YOUR_GOOGLE_DOCS_URL_HERE"
+
+async def run_google_docs_shopping_final(list_id=None, doc_url=None, shop=True):
+    """Run the final Google Docs shopping system
+    
+    The list is saved to the list store under list_id, so runs for
+    different lists can share a working directory. doc_url defaults to
+    GOOGLE_DOCS_URL; shop=False stops once the list is ready, without
+    starting the browser.
+    
+    Returns {"items": [...], "fallback": None} once the list is ready, with
+    "fallback" naming the stand-in used instead of the document ("sample
+    data", "fallback translation" or "default items"), or None if no
+    items could be loaded.
+    """
+    from instrumentation import span
+    from list_store import DEFAULT_LIST_ID
+    list_id = list_id or DEFAULT_LIST_ID
+    doc_url = doc_url or GOOGLE_DOCS_URL
     
     print("=" * 60)
     print("GOOGLE DOCS SHOPPING SYSTEM")
@@ -29,17 +47,17 @@ async def run_google_docs_shopping_final():
     print("\n1. GOOGLE DOCS PROCESSING")
     print("-" * 30)
     
+    fallback = None
     try:
-        from translate_grocery_list import detect_language_simple, extract_google_docs_content
-        
-        # Your Google Docs URL
-        doc_url = "YOUR_GOOGLE_DOCS_URL_HERE"
+        from translate_grocery_list import extract_google_docs_content_async
         
         print(f"Fetching content from Google Docs: {doc_url}")
         
         # Fetch content from Google Docs
-        content_result = extract_google_docs_content(doc_url)
+        with span("docs_fetch"):
+            content_result = await extract_google_docs_content_async(doc_url)
         
+        processed = None
         if not content_result["success"]:
             print(f"ERROR: Failed to fetch from Google Docs: {content_result['error']}")
             print("Falling back to sample data...")
@@ -55,35 +73,53 @@ async def run_google_docs_shopping_final():
 6. Arroz - 1 paquete
 7. Queso - 200 gramos"""
             content = sample_content
+            fallback = "sample data"
         else:
             content = content_result["content"]
             print(f"SUCCESS: Fetched {len(content)} characters from Google Docs")
+            if content_result.get("unchanged"):
+                from translate_grocery_list import get_processed_document
+                processed = get_processed_document(doc_url, content_result["content_hash"])
         
-        # Detect language and translate
-        language = detect_language_simple(content)
-        print(f"Detected language: {language}")
-        
-        if language != "en":
-            print("Translating using DeepL API...")
-            from translate_grocery_list import translate_with_deepl
-            translated_content = translate_with_deepl(content)
-            print("Translated to English using DeepL")
+        if processed is not None:
+            # Same document as last run, reuse its output
+            items = processed["items"]
+            print("Document unchanged since last run, skipping translation and parsing")
+            print(f"Reusing {len(items)} items: {items}")
         else:
-            translated_content = content
-            print("Already in English")
-        
-        # Extract items with quantities
-        from translate_grocery_list import extract_grocery_items_with_quantities
-        items = extract_grocery_items_with_quantities(translated_content)
-        print(f"Extracted {len(items)} items with quantities: {items}")
-        
-        # Save files
-        with open('grocery_list_english.txt', 'w', encoding='utf-8') as f:
-            f.write(translated_content)
-        
-        with open('shopping_items.txt', 'w', encoding='utf-8') as f:
-            for item in items:
-                f.write(item + '\n')
+            # Translate only the lines that are not already in English
+            from translate_grocery_list import translate_document_selectively_async
+            with span("translate", characters=len(content)):
+                translated_content, translation_stats = await translate_document_selectively_async(content)
+            print(f"Detected language: {translation_stats['document_language']}")
+            
+            if translation_stats["translated_lines"]:
+                print(
+                    f"Translated {translation_stats['translated_lines']} of {translation_stats['lines']} lines "
+                    f"({translation_stats['unique_texts']} unique, {translation_stats['characters']} characters sent) using DeepL"
+                )
+            else:
+                print("Already in English")
+            
+            # Extract items with quantities
+            from translate_grocery_list import DEFAULT_GROCERY_ITEMS, extract_grocery_items_with_quantities
+            with span("parse"):
+                items = extract_grocery_items_with_quantities(translated_content, default=None)
+            if not items:
+                print("WARNING: No items found in the document, using default items")
+                items = list(DEFAULT_GROCERY_ITEMS)
+                fallback = fallback or "default items"
+            print(f"Extracted {len(items)} items with quantities: {items}")
+            
+            # Save to the list store
+            from list_store import get_list_store
+            with span("store", items=len(items)):
+                run_id = get_list_store().save_list(list_id, items, source=doc_url, document=translated_content)
+            print(f"Saved list '{list_id}' as run {run_id}")
+            
+            if content_result["success"]:
+                from translate_grocery_list import remember_processed_document
+                remember_processed_document(doc_url, content_result["content_hash"], {"items": items})
         
         print("SUCCESS: Google Docs processing completed!")
         
@@ -91,10 +127,11 @@ async def run_google_docs_shopping_final():
         print(f"ERROR: Google Docs processing failed: {e}")
         # Fallback to existing system
         print("Using fallback translation system...")
+        fallback = "fallback translation"
         from translate_grocery_list import translate_spanish_to_english
-        translate_spanish_to_english()
+        translate_spanish_to_english(list_id)
         from browser_shop import load_grocery_items
-        items = load_grocery_items()
+        items = load_grocery_items(list_id)
     
     # Step 2: Load Items
     print("\n2. ITEM LOADING")
@@ -102,7 +139,7 @@ async def run_google_docs_shopping_final():
     try:
         if 'items' not in locals():
             from browser_shop import load_grocery_items
-            items = load_grocery_items()
+            items = load_grocery_items(list_id)
         
         print(f"SUCCESS: Loaded {len(items)} items")
         print(f"Items: {items}")
@@ -136,11 +173,16 @@ async def run_google_docs_shopping_final():
     print("You can now manually shop on Instacart with this list!")
     print("=" * 60)
     
+    if not shop:
+        print("\nSkipping browser automation")
+        return {"items": items, "fallback": fallback}
+    
     # Optional: Try browser automation (but don't fail if it doesn't work)
     try:
         print("\nAttempting browser automation...")
         from browser_shop import add_to_cart
-        result = await add_to_cart(items)
+        with span("browser", items=len(items)):
+            result = await add_to_cart(items)
         
         if result and result.structured_output:
             cart = result.structured_output
@@ -149,7 +191,6 @@ async def run_google_docs_shopping_final():
             print("SHOPPING RESULTS")
             print("=" * 60)
             
-            total_price = 0
             for item in cart.items:
                 print(f"Item: {item.name}")
                 print(f"Price: ${item.price}")
@@ -159,9 +200,12 @@ async def run_google_docs_shopping_final():
                     print(f"Size: {item.size}")
                 print(f"URL: {item.url}")
                 print("-" * 40)
-                total_price += item.price
             
-            print(f"TOTAL: ${total_price:.2f}")
+            from cart_analytics import CartAnalytics
+            analytics = CartAnalytics.from_carts([("cart", cart)])
+            print(f"TOTAL: ${analytics.grand_total():.2f}")
+            for brand, spend in analytics.spend_by_brand().items():
+                print(f"  {brand or 'No brand'}: ${spend:.2f}")
             print("=" * 60)
         else:
             print("Browser automation had issues, but your shopping list is ready!")
@@ -173,11 +217,24 @@ async def run_google_docs_shopping_final():
     print("\n" + "=" * 60)
     print("GOOGLE DOCS SHOPPING SYSTEM COMPLETE")
     print("=" * 60)
+    return {"items": items, "fallback": fallback}
+
+async def run_and_close():
+    """Run the system, then close the shared HTTP connections"""
+    from async_http import close_http_client
+    import instrumentation
+    try:
+        with instrumentation.span("run"):
+            await run_google_docs_shopping_final()
+    finally:
+        await close_http_client()
+        if instrumentation.is_enabled():
+            instrumentation.dump_metrics(os.environ.get(instrumentation.PROMETHEUS_ENV))
 
 def main():
     """Main function"""
     try:
-        asyncio.run(run_google_docs_shopping_final())
+        asyncio.run(run_and_close())
     except KeyboardInterrupt:
         print("\nProcess interrupted by user")
     except Exception as e:
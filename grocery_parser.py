@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Grocery line parser shared by every list loader
+Turns lines like "1. Leche - 2 litros" into (name, quantity, unit, notes)
+records. Plain "Name - 2 unit" lines take a str-only path; the rest go
+through precompiled patterns. A structured parse still costs several
+times a bare split per line, see parser_benchmark.py.
+"""
+
+import re
+import sys
+from typing import NamedTuple, Optional
+
+from units import UNIT_FACTORS
+
+# "1. ", "1) ", "- ", "* ", "• " list markers in front of the item
+_MARKER = re.compile(r'(?:\d+[.)]|[-*•])\s+')
+
+# "2", "1.5", "1,5", "1/2", "1 1/2", "½", optionally followed by "x"
+_QUANTITY = (
+    r'(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?[½¼¾]?|[½¼¾])'
+)
+# Quantity part after " - ": "2 litros", "1 dozen", "200g", "3x"
+_QUANTITY_PART = re.compile(_QUANTITY + r'\s*(?:x\b\s*)?(?P<unit>[^\W\d_][\w.]*)?\s*(?P<rest>.*)$', re.IGNORECASE)
+# Quantity leading the name: "2 liters milk", "12 eggs", "3x bananas"
+_LEADING_QUANTITY = re.compile(_QUANTITY + r'(?P<sep>\s*x\s+|\s*)(?P<rest>.+)$', re.IGNORECASE)
+_LEADING_UNIT = re.compile(r'(?P<unit>[^\W\d_][\w.]*)\s+(?:of\s+|de\s+)?(?P<rest>.+)$', re.IGNORECASE)
+_NOTES = re.compile(r'\s*\((?P<notes>[^)]*)\)\s*')
+_HEADER = re.compile(r'^(?:shopping list|grocery|grocer(?:y|ies) list|lista de)', re.IGNORECASE)
+
+_FRACTIONS = {'½': 0.5, '¼': 0.25, '¾': 0.75}
+_QUANTITY_START = frozenset('0123456789½¼¾')
+
+# Units recognised in front of a name ("2 liters milk"); after " - " any word is a unit.
+# Same vocabulary as the unit conversions, so every recognised unit converts
+KNOWN_UNITS = frozenset(UNIT_FACTORS)
+
+
+class GroceryLine(NamedTuple):
+    """One parsed grocery list entry (a plain tuple, names and units interned)"""
+
+    name: str
+    quantity: Optional[float]
+    unit: Optional[str]
+    notes: Optional[str]
+    text: str  # the entry without its list marker, e.g. "Leche - 2 litros"
+
+
+def parse_quantity(value):
+    """Parse "2", "1.5", "1,5", "1/2", "1 1/2" or "½" into a float
+
+    Returns None for a zero denominator ("1/0", "1 1/0").
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    value = value.strip()
+    fraction = 0.0
+    if value and value[-1] in _FRACTIONS:
+        fraction = _FRACTIONS[value[-1]]
+        value = value[:-1].strip()
+        if not value:
+            return fraction
+    if ' ' in value:
+        whole, part = value.split(None, 1)
+        part = parse_quantity(part)
+        return None if part is None else float(whole) + part
+    if '/' in value:
+        numerator, denominator = value.split('/', 1)
+        return float(numerator) / float(denominator) if float(denominator) else None
+    return float(value.replace(',', '.')) + fraction
+
+
+def _split_notes(text):
+    if '(' not in text:
+        return text, None
+    notes = [match.group('notes').strip() for match in _NOTES.finditer(text)]
+    if not notes:
+        return text, None
+    text = _NOTES.sub(' ', text).strip()
+    return text, '; '.join(note for note in notes if note) or None
+
+
+def grocery_line_from_parts(name, quantity_text='', notes=None, text=None):
+    """Build a GroceryLine from an item name and a free-form quantity"""
+    name, name_notes = _split_notes(name.strip())
+    quantity = unit = None
+    quantity_text = (quantity_text or '').strip()
+    extra = [name_notes] if name_notes else []
+
+    if quantity_text:
+        quantity_text, quantity_notes = _split_notes(quantity_text)
+        if quantity_notes:
+            extra.append(quantity_notes)
+        match = _QUANTITY_PART.match(quantity_text)
+        if match:
+            qty, unit, rest = match.groups()
+            quantity = parse_quantity(qty)
+            if unit:
+                unit = unit.lower()
+            if rest:
+                extra.append(rest)
+        else:
+            extra.append(quantity_text)
+
+    if notes:
+        extra.append(notes)
+    if text is None:
+        text = f"{name} - {quantity_text}" if quantity_text else name
+    return GroceryLine(sys.intern(name), quantity, unit and sys.intern(unit), '; '.join(extra) if extra else None, text)
+
+
+def split_list_marker(line):
+    """Split "1. Leche" into ("1. ", "Leche"); lines without a marker give ("", line)"""
+    match = _MARKER.match(line)
+    if match is None:
+        return '', line
+    return line[:match.end()], line[match.end():]
+
+
+def parse_grocery_line(line, require_marker=False):
+    """Parse one line, returns a GroceryLine or None for blanks and headers
+
+    With require_marker only numbered ("1. ") or bulleted ("- ") lines
+    count as items, matching how the shopping list files are written.
+    """
+    body = line.strip()
+    if not body:
+        return None
+
+    marker = _MARKER.match(body)
+    if marker is not None:
+        body = body[marker.end():]
+        if not body:
+            return None
+    elif require_marker or body.endswith(':') or _HEADER.match(body):
+        return None
+
+    if ' - ' in body:
+        name, quantity_text = body.split(' - ', 1)
+        name = name.strip()
+        if not name:
+            return None
+        # Common "Name - 2 unit" shape without notes, skips the regexes
+        if '(' not in body:
+            parts = quantity_text.split()
+            if 0 < len(parts) < 3 and parts[0].isdecimal():
+                if len(parts) == 1:
+                    return GroceryLine(sys.intern(name), float(parts[0]), None, None, body)
+                unit = parts[1].lower()
+                if unit.isalpha() and unit != 'x':
+                    return GroceryLine(sys.intern(name), float(parts[0]), sys.intern(unit), None, body)
+        return grocery_line_from_parts(name, quantity_text, text=body)
+
+    leading = _LEADING_QUANTITY.match(body) if body[0] in _QUANTITY_START else None
+    if leading:
+        qty, sep, rest = leading.groups()
+        unit = None
+        unit_match = _LEADING_UNIT.match(rest)
+        if unit_match and unit_match.group('unit').lower() in KNOWN_UNITS:
+            unit = sys.intern(unit_match.group('unit').lower())
+            rest = unit_match.group('rest')
+        # "200g flour" has a unit glued to the number, "7up" is just a name
+        if sep or unit:
+            name, notes = _split_notes(rest)
+            return GroceryLine(sys.intern(name), parse_quantity(qty), unit, notes, body)
+
+    name, notes = _split_notes(body)
+    if not name:
+        return None
+    return GroceryLine(sys.intern(name), None, None, notes, body)
+
+
+def iter_grocery_lines(lines, require_marker=False):
+    """Lazily parse an iterable of lines (a file object works), skipping non-items"""
+    for line in lines:
+        record = parse_grocery_line(line, require_marker)
+        if record is not None:
+            yield record
+
+
+def parse_grocery_text(text, require_marker=False):
+    """Parse a whole document into a list of GroceryLine records"""
+    return list(iter_grocery_lines(text.splitlines(), require_marker))
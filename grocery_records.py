@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compact internal records for list and cart data
+Pydantic models (GroceryItem / GroceryCart) are only used at the agent
+boundary; batch code works on these slotted and column-oriented types
+"""
+
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+
+def intern_text(value):
+    """sys.intern for optional strings, so repeated names share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _field(item, name, default=None):
+    """Read a field from a dict, a dataclass or a pydantic model"""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+@dataclass(slots=True)
+class CartItem:
+    """One product in a cart, without pydantic validation overhead"""
+
+    name: str
+    price: float
+    brand: Optional[str] = None
+    size: Optional[str] = None
+    url: str = ''
+    query: Optional[str] = None
+
+    @classmethod
+    def from_item(cls, item):
+        """Build from a GroceryItem, a dict or another CartItem"""
+        return cls(
+            intern_text(_field(item, 'name')),
+            float(_field(item, 'price', 0.0)),
+            intern_text(_field(item, 'brand')),
+            intern_text(_field(item, 'size')),
+            intern_text(_field(item, 'url', '')),
+            intern_text(_field(item, 'query')),
+        )
+
+    def as_dict(self):
+        """Plain dict with the GroceryItem fields, e.g. GroceryItem(**item.as_dict())"""
+        return {
+            'name': self.name,
+            'price': self.price,
+            'brand': self.brand,
+            'size': self.size,
+            'url': self.url,
+            'query': self.query,
+        }
+
+
+class CartBatch:
+    """Column-oriented store for many carts
+
+    Each field is one column: prices live in a float array, repeated
+    strings (names, brands, sizes, URLs, cart IDs) are interned, and the
+    owning cart of each row is an index into ``cart_ids``.
+    """
+
+    __slots__ = ('cart_ids', 'cart_index', 'names', 'prices', 'brands', 'sizes', 'urls', 'queries', '_cart_positions')
+
+    def __init__(self):
+        self.cart_ids = []
+        self.cart_index = array('I')
+        self.names = []
+        self.prices = array('d')
+        self.brands = []
+        self.sizes = []
+        self.urls = []
+        self.queries = []
+        self._cart_positions = {}
+
+    def __len__(self):
+        return len(self.prices)
+
+    def _cart_position(self, cart_id):
+        position = self._cart_positions.get(cart_id)
+        if position is None:
+            position = len(self.cart_ids)
+            self.cart_ids.append(intern_text(cart_id))
+            self._cart_positions[cart_id] = position
+        return position
+
+    def add_item(self, cart_id, item):
+        """Append one item (GroceryItem, CartItem or dict) to a cart"""
+        self.cart_index.append(self._cart_position(cart_id))
+        self.names.append(intern_text(_field(item, 'name')))
+        self.prices.append(float(_field(item, 'price', 0.0)))
+        self.brands.append(intern_text(_field(item, 'brand')))
+        self.sizes.append(intern_text(_field(item, 'size')))
+        self.urls.append(intern_text(_field(item, 'url', '')))
+        self.queries.append(intern_text(_field(item, 'query')))
+
+    def add_cart(self, cart_id, cart):
+        """Append every item of a GroceryCart (or any iterable of items)"""
+        items = _field(cart, 'items', cart) if not isinstance(cart, (list, tuple)) else cart
+        for item in items:
+            self.add_item(cart_id, item)
+
+    def item(self, row):
+        """Materialise one row as a CartItem"""
+        return CartItem(
+            self.names[row], self.prices[row], self.brands[row],
+            self.sizes[row], self.urls[row], self.queries[row],
+        )
+
+    def iter_items(self):
+        """Yield (cart_id, CartItem) for every row"""
+        for row in range(len(self)):
+            yield self.cart_ids[self.cart_index[row]], self.item(row)
+
+    def cart_items(self, cart_id):
+        """All items of one cart as CartItems"""
+        position = self._cart_positions.get(cart_id)
+        if position is None:
+            return []
+        return [self.item(row) for row, owner in enumerate(self.cart_index) if owner == position]
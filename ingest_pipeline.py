@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of many grocery lists in one job
+Streams a manifest of Google Docs URLs and Notion databases through
+fetch -> detect -> translate -> parse -> persist stages, connected by
+bounded queues with a worker pool per stage
+"""
+
+import asyncio
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import manus_final_system
+import translate_grocery_list
+from async_http import close_http_client
+from grocery_parser import iter_grocery_lines
+from language_detect import detect_language
+from list_store import get_list_store
+from manus_client import AsyncManusClient
+
+DOCS = "google_docs"
+NOTION = "notion"
+INVALID = "invalid"  # manifest line that could not be read, carried as a failed job
+
+DEFAULT_WORKERS = {
+    "fetch": 16,
+    "detect": 2,
+    "translate": 8,
+    "parse": 2,
+    "persist": 2,
+}
+DEFAULT_QUEUE_SIZE = 100
+REPORT_INTERVAL = 5.0
+
+_DOC_ID = re.compile(r'/document/d/([\w-]+)')
+
+
+@dataclass(slots=True)
+class ListJob:
+    """One list moving through the pipeline"""
+
+    list_id: str
+    kind: str
+    source: str
+    content: Optional[str] = None
+    content_hash: Optional[str] = None
+    language: Optional[str] = None
+    translated: Optional[str] = None
+    items: Optional[list] = None
+    reused: bool = False  # unchanged document, items come from the last run
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class StageStats:
+    processed: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+
+def manifest_entry(entry):
+    """Turn one manifest entry into a ListJob
+
+    Entries are either a string (a Docs URL, or a Notion database ID,
+    optionally written as "notion:<id>") or a dict with "docs_url" or
+    "notion_database_id" and an optional "list_id".
+    """
+    if isinstance(entry, str):
+        entry = entry.strip()
+        if entry.startswith("notion:"):
+            entry = {"notion_database_id": entry[len("notion:"):].strip()}
+        elif entry.startswith("http"):
+            entry = {"docs_url": entry}
+        else:
+            entry = {"notion_database_id": entry}
+
+    if entry.get("docs_url"):
+        kind, source = DOCS, entry["docs_url"]
+        match = _DOC_ID.search(source)
+        default_id = match.group(1) if match else source
+    elif entry.get("notion_database_id"):
+        kind, source = NOTION, entry["notion_database_id"]
+        default_id = source
+    else:
+        raise ValueError(f"Manifest entry has no docs_url or notion_database_id: {entry}")
+    return ListJob(str(entry.get("list_id") or default_id), kind, source)
+
+
+def load_manifest(path):
+    """Lazily read a manifest file: JSON lines or one URL / database ID per line
+
+    A line that cannot be read becomes a failed ListJob (kind INVALID,
+    list ID "line <n>") so one bad entry does not stop the job.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                job = manifest_entry(json.loads(line) if line.startswith('{') else line)
+            except (ValueError, TypeError, AttributeError) as e:
+                job = ListJob(f"line {number}", INVALID, line, error=f"manifest: {e}")
+            yield job
+
+
+class IngestPipeline:
+    """Runs many lists through the ingestion stages concurrently
+
+    ``workers`` maps stage names to worker counts (missing stages use
+    DEFAULT_WORKERS) and ``queue_size`` bounds each queue between stages,
+    so a slow stage pushes back on the ones in front of it instead of
+    buffering the whole manifest. Each list is saved to the ListStore
+    under its list ID. Docs and DeepL requests go through the shared
+    async HTTP client; store writes and Notion page-following run in
+    threads, and Notion lists are fetched through one AsyncManusClient.
+    """
+
+    STAGES = ("fetch", "detect", "translate", "parse", "persist")
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, store=None,
+                 target_lang='EN', manus_client=None, report_interval=REPORT_INTERVAL):
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.queue_size = queue_size
+        self.store = store or get_list_store()
+        self.target_lang = target_lang
+        self.report_interval = report_interval
+        self._manus_client = manus_client
+        self._own_manus_client = manus_client is None
+        self.stats = {stage: StageStats() for stage in self.STAGES}
+        self.results = []
+        self._queues = {}
+        self._started = None
+
+    async def _fetch(self, job):
+        if job.kind == DOCS:
+            result = await translate_grocery_list.extract_google_docs_content_async(job.source)
+            if not result["success"]:
+                job.error = result["error"]
+                return
+            job.content = result["content"]
+            job.content_hash = result["content_hash"]
+            if result.get("unchanged"):
+                processed = translate_grocery_list.get_processed_document(job.source, job.content_hash)
+                if processed is not None:
+                    job.items = processed["items"]
+                    job.reused = True
+        else:
+            if self._manus_client is None:
+                self._manus_client = AsyncManusClient()
+            payload = manus_final_system.build_notion_task_payload(database_id=job.source)
+            data = await self._manus_client.run_task(payload)
+            if not data:
+                job.error = f"Manus task for Notion database {job.source} failed"
+                return
+            # Following next_cursor pages is blocking I/O
+            job.content = await asyncio.to_thread(self._notion_document, data, job.source)
+
+    @staticmethod
+    def _notion_document(data, database_id):
+        return '\n'.join(f"- {record.text}" for record in manus_final_system.iter_notion_data(data, database_id))
+
+    async def _detect(self, job):
+        if job.items is None:
+            job.language = detect_language(job.content, default=self.target_lang.lower())[0]
+
+    async def _translate(self, job):
+        if job.items is None:
+            job.translated, _ = await translate_grocery_list.translate_document_selectively_async(
+                job.content, self.target_lang, job.language,
+            )
+
+    async def _parse(self, job):
+        if job.items is None:
+            # No demo-list fallback here: an empty document must not become a list to shop
+            job.items = [record.text for record in iter_grocery_lines(job.translated.splitlines(), require_marker=True)]
+            if not job.items:
+                job.error = "parse: no items"
+
+    def _processed_runs(self, job):
+        """List ID -> run ID of the runs saved from this job's document content"""
+        processed = translate_grocery_list.get_processed_document(job.source, job.content_hash) or {}
+        return dict(processed.get("runs", {}))
+
+    async def _persist(self, job):
+        document = job.translated
+        if job.reused:
+            # The processed-document cache is keyed by Docs URL only, so another
+            # list (e.g. another tenant's) may share it without having a run yet
+            runs = self._processed_runs(job)
+            latest = await asyncio.to_thread(self.store.latest_run, job.list_id)
+            if latest is not None and latest == runs.get(job.list_id):
+                return
+            if runs:
+                document = await asyncio.to_thread(self.store.load_document, run_id=next(iter(runs.values())))
+        run_id = await asyncio.to_thread(
+            self.store.save_list, job.list_id, job.items, source=job.source, document=document,
+        )
+        if job.kind == DOCS:
+            # Re-read after the save, so lists persisted meanwhile are kept
+            runs = self._processed_runs(job)
+            runs[job.list_id] = run_id
+            translate_grocery_list.remember_processed_document(
+                job.source, job.content_hash, {"items": job.items, "runs": runs},
+            )
+
+    def _handlers(self):
+        return {
+            "fetch": self._fetch,
+            "detect": self._detect,
+            "translate": self._translate,
+            "parse": self._parse,
+            "persist": self._persist,
+        }
+
+    async def _run_stage(self, stage, handler, job):
+        stats = self.stats[stage]
+        started = time.perf_counter()
+        try:
+            await handler(job)
+        except Exception as e:
+            job.error = f"{stage}: {e}"
+        stats.busy_seconds += time.perf_counter() - started
+        if job.error is None:
+            stats.processed += 1
+        else:
+            stats.errors += 1
+
+    async def ingest(self, job):
+        """Run one ListJob through every stage in turn, returns it
+
+        For callers that schedule lists themselves instead of streaming a
+        manifest through run(); stage stats are kept the same way.
+        """
+        for stage, handler in self._handlers().items():
+            if job.error is not None:
+                break
+            await self._run_stage(stage, handler, job)
+        return job
+
+    async def _worker(self, stage, handler, inbox, outbox):
+        while True:
+            job = await inbox.get()
+            try:
+                if job.error is None:
+                    await self._run_stage(stage, handler, job)
+                if outbox is not None:
+                    await outbox.put(job)
+                else:
+                    self.results.append(job)
+            finally:
+                inbox.task_done()
+
+    async def _sample_queues(self):
+        while True:
+            for stage, queue in self._queues.items():
+                stats = self.stats[stage]
+                stats.max_queue_depth = max(stats.max_queue_depth, queue.qsize())
+            await asyncio.sleep(0.1)
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            elapsed = time.perf_counter() - self._started
+            parts = [
+                f"{stage} {self.stats[stage].processed} ({self.stats[stage].processed / elapsed:.1f}/s, "
+                f"queue {self._queues[stage].qsize()})"
+                for stage in self.STAGES
+            ]
+            print(f"[{elapsed:.0f}s] " + " | ".join(parts))
+
+    async def run(self, jobs):
+        """Ingest every ListJob from an iterable, returns the report dict"""
+        self._started = time.perf_counter()
+        self._queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in self.STAGES}
+        handlers = self._handlers()
+
+        stage_tasks = {}
+        for position, stage in enumerate(self.STAGES):
+            outbox = self._queues[self.STAGES[position + 1]] if position + 1 < len(self.STAGES) else None
+            stage_tasks[stage] = [
+                asyncio.create_task(self._worker(stage, handlers[stage], self._queues[stage], outbox))
+                for _ in range(max(1, self.workers[stage]))
+            ]
+        monitors = [asyncio.create_task(self._sample_queues())]
+        if self.report_interval:
+            monitors.append(asyncio.create_task(self._report_progress()))
+
+        try:
+            submitted = 0
+            for job in jobs:
+                await self._queues["fetch"].put(job)
+                submitted += 1
+
+            # Drain stage by stage: once a queue is empty and its workers
+            # are idle, everything has moved on to the next stage
+            for stage in self.STAGES:
+                await self._queues[stage].join()
+                for task in stage_tasks[stage]:
+                    task.cancel()
+        finally:
+            for task in monitors + [task for tasks in stage_tasks.values() for task in tasks]:
+                task.cancel()
+            await self.close()
+
+        return self.report(submitted)
+
+    async def close(self):
+        """Release the Manus client if the pipeline created it"""
+        if self._own_manus_client and self._manus_client is not None:
+            await self._manus_client.close()
+            self._manus_client = None
+
+    def report(self, submitted=None):
+        """Per-stage throughput, busy time and queue depth"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        stages = {}
+        for stage, stats in self.stats.items():
+            stages[stage] = {
+                "workers": self.workers[stage],
+                "processed": stats.processed,
+                "errors": stats.errors,
+                "throughput_per_s": stats.processed / elapsed if elapsed else 0.0,
+                "busy_seconds": round(stats.busy_seconds, 3),
+                "max_queue_depth": stats.max_queue_depth,
+            }
+        return {
+            "lists": len(self.results) if submitted is None else submitted,
+            "succeeded": sum(1 for job in self.results if job.error is None),
+            "reused": sum(1 for job in self.results if job.reused),
+            "failed": [(job.list_id, job.error) for job in self.results if job.error],
+            "items": sum(len(job.items or ()) for job in self.results if job.error is None),
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": stages,
+        }
+
+
+async def ingest_manifest(path, **options):
+    """Run every entry of a manifest file through an IngestPipeline"""
+    pipeline = IngestPipeline(**options)
+    try:
+        return await pipeline.run(load_manifest(path))
+    finally:
+        await close_http_client()
+
+
+def print_report(report):
+    print("=" * 60)
+    print("INGESTION REPORT")
+    print("=" * 60)
+    print(f"Lists: {report['lists']} ({report['succeeded']} ok, {report['reused']} unchanged, "
+          f"{len(report['failed'])} failed) in {report['elapsed_seconds']:.1f}s")
+    print(f"Items: {report['items']}")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<10} workers={stats['workers']:<3} done={stats['processed']:<6} "
+              f"errors={stats['errors']:<4} {stats['throughput_per_s']:.1f}/s "
+              f"busy={stats['busy_seconds']:.1f}s max_queue={stats['max_queue_depth']}")
+    for list_id, error in report["failed"][:10]:
+        print(f"  FAILED {list_id}: {error}")
+
+
+def main():
+    """python ingest_pipeline.py <manifest> [stage=workers ...], e.g. fetch=32 translate=16"""
+    if len(sys.argv) < 2:
+        print(main.__doc__)
+        return
+    workers = {}
+    for arg in sys.argv[2:]:
+        stage, _, count = arg.partition('=')
+        if stage not in IngestPipeline.STAGES or not count.isdigit():
+            print(f"Unknown option: {arg}")
+            return
+        workers[stage] = int(count)
+    print_report(asyncio.run(ingest_manifest(sys.argv[1], workers=workers)))
+
+
+if __name__ == "__main__":
+    main()
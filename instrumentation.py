@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Stage timing and tracing for the shopping pipeline
+Spans with wall and CPU time, HTTP counts and latencies per upstream and
+agent steps per item, exported as JSON lines or Prometheus text
+
+Off by default and close to free while off. Turn it on with enable() or
+the AI_SHOPPING_METRICS environment variable ("1", or a path to append
+JSON lines to); AI_SHOPPING_METRICS_PROM names a file for the Prometheus
+text written at the end of a run.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+METRICS_ENV = "AI_SHOPPING_METRICS"
+PROMETHEUS_ENV = "AI_SHOPPING_METRICS_PROM"
+
+# Upper bounds (seconds) of the HTTP latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP = nullcontext()
+
+
+class _Metrics:
+    """Aggregated measurements, guarded by one lock (HTTP hooks run in threads)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.spans = {}  # name -> [count, wall seconds, cpu seconds, errors]
+        self.http = {}  # upstream -> [count, errors, seconds, bucket counts]
+        self.agents = {}  # label -> [runs, steps, items]
+
+
+_metrics = _Metrics()
+_enabled = False
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def enable(jsonl_path=None):
+    """Start recording; with jsonl_path every event is also appended there as JSON"""
+    global _enabled, _sink
+    disable()
+    if jsonl_path:
+        _sink = open(jsonl_path, 'a', encoding='utf-8')
+    _enabled = True
+
+
+def disable():
+    """Stop recording (aggregates are kept until reset())"""
+    global _enabled, _sink
+    _enabled = False
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+            _sink = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _metrics.lock:
+        _metrics.reset()
+
+
+def _emit(event):
+    if _sink is None:
+        return
+    line = json.dumps(event, default=str)
+    with _sink_lock:
+        if _sink is not None:
+            _sink.write(line + '\n')
+            _sink.flush()
+
+
+class _Span:
+    __slots__ = ('name', 'attrs', 'wall', 'cpu')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        # Process CPU time: includes other coroutines and threads that ran meanwhile
+        cpu = time.process_time() - self.cpu
+        with _metrics.lock:
+            totals = _metrics.spans.setdefault(self.name, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] += exc_type is not None
+        _emit({
+            "type": "span",
+            "name": self.name,
+            "ts": time.time(),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "error": exc_type.__name__ if exc_type else None,
+            **self.attrs,
+        })
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing one stage; works in sync and async code
+
+        with span("translate", lines=120):
+            ...
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def record_http(upstream, method, status, seconds):
+    """Count one HTTP call to an upstream (a host name); status None means it failed"""
+    if not _enabled:
+        return
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+    with _metrics.lock:
+        totals = _metrics.http.get(upstream)
+        if totals is None:
+            totals = _metrics.http[upstream] = [0, 0, 0.0, [0] * (len(LATENCY_BUCKETS) + 1)]
+        totals[0] += 1
+        totals[1] += status is None or status >= 500
+        totals[2] += seconds
+        totals[3][bucket] += 1
+    _emit({
+        "type": "http",
+        "upstream": upstream,
+        "method": method,
+        "status": status,
+        "ts": time.time(),
+        "seconds": round(seconds, 6),
+    })
+
+
+def _requests_hook(response, *args, **kwargs):
+    if _enabled:
+        record_http(response.url.split('/')[2], response.request.method, response.status_code,
+                    response.elapsed.total_seconds())
+
+
+def instrument_session(session):
+    """Record every request made through a requests.Session
+
+    Responses are recorded by a response hook; requests that raise
+    (connection errors, timeouts) never reach the hook and are recorded
+    with status None by a wrapper around session.request.
+    """
+    session.hooks.setdefault('response', []).append(_requests_hook)
+    request = session.request
+
+    def recorded_request(method, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return request(method, url, *args, **kwargs)
+        except Exception:
+            if _enabled:
+                record_http(urlsplit(url).netloc, method.upper(), None, time.perf_counter() - started)
+            raise
+
+    session.request = recorded_request
+    return session
+
+
+def agent_steps(result):
+    """Number of steps in a browser-use run result, 0 if unknown"""
+    if result is None:
+        return 0
+    if hasattr(result, 'number_of_steps'):
+        return result.number_of_steps()
+    return len(getattr(result, 'history', ()) or ())
+
+
+def record_agent_run(label, steps, items):
+    """Count one agent run of `steps` steps that handled `items` items"""
+    if not _enabled:
+        return
+    with _metrics.lock:
+        totals = _metrics.agents.setdefault(label, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += steps
+        totals[2] += items
+    _emit({
+        "type": "agent",
+        "label": label,
+        "ts": time.time(),
+        "steps": steps,
+        "items": items,
+        "steps_per_item": steps / items if items else None,
+    })
+
+
+def snapshot():
+    """All aggregates as a plain dict"""
+    with _metrics.lock:
+        return {
+            "spans": {
+                name: {"count": count, "wall_s": wall, "cpu_s": cpu, "errors": errors}
+                for name, (count, wall, cpu, errors) in _metrics.spans.items()
+            },
+            "http": {
+                upstream: {
+                    "count": count,
+                    "errors": errors,
+                    "seconds": seconds,
+                    "mean_s": seconds / count if count else 0.0,
+                }
+                for upstream, (count, errors, seconds, _) in _metrics.http.items()
+            },
+            "agents": {
+                label: {
+                    "runs": runs,
+                    "steps": steps,
+                    "items": items,
+                    "steps_per_item": steps / items if items else None,
+                }
+                for label, (runs, steps, items) in _metrics.agents.items()
+            },
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def prometheus_text():
+    """Aggregates in the Prometheus text exposition format"""
+    lines = []
+    with _metrics.lock:
+        spans = dict(_metrics.spans)
+        http = {upstream: (c, e, s, list(b)) for upstream, (c, e, s, b) in _metrics.http.items()}
+        agents = dict(_metrics.agents)
+
+    def family(name, kind, samples):
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+
+    family("shopping_span_total", "counter",
+           ((f'stage="{_label(name)}"', count) for name, (count, _, _, _) in spans.items()))
+    family("shopping_span_errors_total", "counter",
+           ((f'stage="{_label(name)}"', errors) for name, (_, _, _, errors) in spans.items()))
+    family("shopping_span_seconds_total", "counter", (
+        (f'stage="{_label(name)}",clock="{clock}"', f"{seconds:.6f}")
+        for name, (_, wall, cpu, _) in spans.items()
+        for clock, seconds in (("wall", wall), ("cpu", cpu))
+    ))
+
+    lines.append("# TYPE shopping_http_request_seconds histogram")
+    for upstream, (count, errors, seconds, buckets) in http.items():
+        host = _label(upstream)
+        cumulative = 0
+        for bound, hits in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+            cumulative += hits
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'shopping_http_request_seconds_bucket{{upstream="{host}",le="{le}"}} {cumulative}')
+        lines.append(f'shopping_http_request_seconds_sum{{upstream="{host}"}} {seconds:.6f}')
+        lines.append(f'shopping_http_request_seconds_count{{upstream="{host}"}} {count}')
+    family("shopping_http_errors_total", "counter",
+           ((f'upstream="{_label(upstream)}"', errors) for upstream, (_, errors, _, _) in http.items()))
+
+    for name, index in (("runs", 0), ("steps", 1), ("items", 2)):
+        family(f"shopping_agent_{name}_total", "counter",
+               ((f'agent="{_label(label)}"', totals[index]) for label, totals in agents.items()))
+    return '\n'.join(lines) + '\n'
+
+
+def dump_metrics(path=None):
+    """Write prometheus_text() to path, or print it"""
+    text = prometheus_text()
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"📊 Metrics written to {path}")
+    else:
+        print(text, end='')
+
+
+def _enable_from_environment():
+    value = os.environ.get(METRICS_ENV, '').strip()
+    if not value or value.lower() in ('0', 'false', 'off'):
+        return
+    enable(None if value.lower() in ('1', 'true', 'on') else value)
+
+
+_enable_from_environment()
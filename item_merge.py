@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Merge duplicate grocery items before shopping
+Entries that name the same product ("Milk - 1 gallon", "milk - 2 liters")
+collapse into one, with quantities converted and added where the units
+are compatible, so each product costs one browser search. Notes are part
+of the product: "Milk (skim)" and "Milk (lactose free)" stay apart
+"""
+
+import re
+import unicodedata
+
+from grocery_parser import GroceryLine, parse_grocery_line
+from units import UNIT_FACTORS, unit_info
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+_SPACES = re.compile(r'\s+')
+
+
+# Singular grocery words whose plural may be folded onto them; any other
+# word keeps its plural, so "glasses" never becomes "glass"
+GROCERY_NOUNS = frozenset("""
+    apple apricot avocado bagel banana bean beet berry biscuit blueberry bun cake carrot cherry chip
+    clementine cookie cracker cranberry cucumber date egg fig grape grapefruit kiwi leek lemon lentil lime
+    mango melon muffin mushroom nectarine noodle nut olive onion orange pancake pea peach peanut pear pepper
+    pickle pie pineapple plum potato pretzel radish raisin raspberry roll sausage scallion shallot strawberry
+    tangerine tomato tortilla waffle walnut wing yam zucchini
+    aguacate cebolla fresa galleta huevo limon manzana naranja papa pepino platano tomate uva zanahoria
+""".split()) | frozenset(UNIT_FACTORS)
+
+
+def _singular(word):
+    """Singular of a known grocery noun or unit, any other word unchanged"""
+    candidates = []
+    if word.endswith('ies'):
+        candidates += [word[:-3] + 'y', word[:-1]]
+    if word.endswith('es'):
+        candidates.append(word[:-2])
+    if word.endswith('s'):
+        candidates.append(word[:-1])
+    for candidate in candidates:
+        if candidate in GROCERY_NOUNS:
+            return candidate
+    return word
+
+
+def canonical_name(name):
+    """Matching key for an item name: no accents, case, punctuation or plural
+
+    "Tomatoes", "tomato" and "Tomátoes!" all give "tomato". Only plurals
+    of GROCERY_NOUNS are folded; "Glasses" stays "glasses".
+    """
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    words = _SPACES.sub(' ', _NON_WORD.sub(' ', text)).split()
+    if not words:
+        return name.casefold().strip()
+    words[-1] = _singular(words[-1])
+    return ' '.join(words)
+
+
+def merge_key(record):
+    """Canonical name plus canonical notes; entries with the same key are one product"""
+    return canonical_name(record.name), canonical_name(record.notes) if record.notes else ''
+
+
+def _as_record(item):
+    if isinstance(item, GroceryLine):
+        return item
+    item = str(item)
+    return parse_grocery_line(item) or GroceryLine(item, None, None, None, item)
+
+
+def _format_amount(amount):
+    return f"{amount:.2f}".rstrip('0').rstrip('.')
+
+
+class _MergedItem:
+    """Running total for one canonical name"""
+
+    __slots__ = ('first', 'name', 'totals', 'notes', 'count')
+
+    def __init__(self, first):
+        self.first = first
+        self.name = first.name
+        # key -> [amount, display unit, factor of the display unit]; the key is
+        # a dimension for known units, or ("unit", unit) for unknown ones
+        self.totals = {}
+        # Same for every entry up to spelling, as notes are part of the merge key
+        self.notes = first.notes
+        self.count = 0
+
+    def add(self, record):
+        self.count += 1
+        if record.quantity is None:
+            return
+        info = unit_info(record.unit)
+        if info is None:
+            key, factor = ('unit', record.unit), 1.0
+        else:
+            key, factor = info
+        total = self.totals.get(key)
+        if total is None:
+            self.totals[key] = [record.quantity * factor, record.unit, factor]
+        else:
+            total[0] += record.quantity * factor
+
+    def record(self):
+        if self.count == 1:
+            return self.first
+        parts = []
+        for amount, unit, factor in self.totals.values():
+            quantity = _format_amount(amount / factor)
+            parts.append(f"{quantity} {unit}" if unit else quantity)
+        name = f"{self.name} ({self.notes})" if self.notes else self.name
+        text = f"{name} - {' + '.join(parts)}" if parts else name
+        quantity = unit = None
+        if self.totals:
+            amount, unit, factor = next(iter(self.totals.values()))
+            quantity = amount / factor
+        return GroceryLine(self.name, quantity, unit, self.notes, text)
+
+
+def merge_grocery_items(items):
+    """Collapse items naming the same product, returns GroceryLine records
+
+    Items are GroceryLine records or entry strings like "Milk - 1 gallon".
+    Only entries with the same name and the same notes merge, so variants
+    such as "Milk (skim)" keep their own search. The first spelling is
+    kept and the result keeps first-seen order. Quantities in compatible units are added in the unit of the
+    first entry ("Milk - 1 gallon" + "milk - 2 liters" -> "Milk - 1.53
+    gallon"); incompatible ones are listed together ("1 gallon + 2").
+    """
+    index = {}
+    for item in items:
+        record = _as_record(item)
+        key = merge_key(record)
+        merged = index.get(key)
+        if merged is None:
+            merged = index[key] = _MergedItem(record)
+        merged.add(record)
+    return [merged.record() for merged in index.values()]
+
+
+def merge_item_texts(items):
+    """merge_grocery_items for plain entry strings, returns their merged text"""
+    return [record.text for record in merge_grocery_items(items)]
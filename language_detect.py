@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Lightweight language detection for grocery lists
+Whole-word lookups against precompiled per-language word sets, one pass
+over the text, stopping as soon as the answer is clear
+"""
+
+import re
+
+# Common grocery vocabulary plus frequent function words per language
+LANGUAGE_WORDS = {
+    "es": """
+        leche huevos pan manzanas pollo arroz queso yogur tomates cebollas patatas papas aceite sal
+        azúcar azucar harina mantequilla carne cerdo res pescado atún atun jamón jamon frijoles
+        lechuga zanahorias plátanos platanos naranjas limones uvas fresas ajo pimienta agua cerveza
+        vino galletas cereal café cafe jugo zumo
+        litros litro docena kilo kilos gramos gramo unidades unidad paquete paquetes barras barra
+        botella botellas lata latas bolsa caja
+        lista compras supermercado de del la las los el y con para sin
+    """,
+    "en": """
+        milk eggs bread apples chicken rice cheese yogurt tomatoes onions potatoes oil salt sugar
+        flour butter meat pork beef fish tuna ham beans lettuce carrots bananas oranges lemons
+        grapes strawberries garlic pepper water beer wine cookies cereal coffee juice
+        liters liter litres dozen pounds pound lb lbs ounces oz grams gram units package packages
+        loaves loaf bottle bottles can cans bag box gallon gallons
+        shopping list grocery groceries supermarket store of the and with for without
+    """,
+    "fr": """
+        lait oeufs œufs pain pommes poulet riz fromage yaourt tomates oignons huile sel sucre
+        farine beurre viande porc boeuf bœuf poisson thon jambon haricots laitue carottes
+        bananes oranges citrons raisins fraises ail poivre eau bière biere vin biscuits café jus
+        litres douzaine kilo grammes paquet bouteille boîte boite sac
+        liste courses supermarché de du la les le et avec pour sans
+    """,
+    "de": """
+        milch eier brot äpfel apfel hähnchen huhn reis käse kase joghurt tomaten zwiebeln
+        kartoffeln öl salz zucker mehl butter fleisch schweinefleisch rindfleisch fisch thunfisch
+        schinken bohnen salat karotten bananen orangen zitronen trauben erdbeeren knoblauch
+        pfeffer wasser bier wein kekse kaffee saft
+        liter dutzend kilo gramm packung flasche dose tüte
+        einkaufsliste einkaufen supermarkt der die das und mit für ohne
+    """,
+    "it": """
+        latte uova pane mele pollo riso formaggio yogurt pomodori cipolle patate olio sale
+        zucchero farina burro carne maiale manzo pesce tonno prosciutto fagioli lattuga carote
+        banane arance limoni uva fragole aglio pepe acqua birra vino biscotti caffè succo
+        litri dozzina chilo grammi confezione bottiglia lattina sacchetto
+        lista spesa supermercato di del della il lo gli e con per senza
+    """,
+    "pt": """
+        leite ovos pão pao maçãs macas frango arroz queijo iogurte tomates cebolas batatas azeite
+        óleo sal açúcar acucar farinha manteiga carne porco peixe atum presunto feijão feijao
+        alface cenouras bananas laranjas limões uvas morangos alho pimenta água agua cerveja
+        vinho biscoitos café suco
+        litros dúzia duzia quilo gramas pacote garrafa lata saco caixa
+        lista compras supermercado de do da o os e com para sem
+    """,
+}
+
+# word -> languages it belongs to, built once at import
+WORD_LANGUAGES = {}
+for _language, _words in LANGUAGE_WORDS.items():
+    for _word in _words.split():
+        WORD_LANGUAGES.setdefault(_word, set()).add(_language)
+WORD_LANGUAGES = {word: frozenset(languages) for word, languages in WORD_LANGUAGES.items()}
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+DEFAULT_MIN_HITS = 3
+DEFAULT_THRESHOLD = 0.75
+
+
+def detect_language(text, min_hits=DEFAULT_MIN_HITS, threshold=DEFAULT_THRESHOLD, default=None):
+    """Return (language, confidence) for text
+
+    Words are matched whole (so "sal" does not match "salmon"). Scanning
+    stops once the leading language has min_hits matches and holds at
+    least `threshold` of all matches. Returns (default, 0.0) when no
+    language reaches min_hits or there is a tie.
+    """
+    counts = {}
+    total = 0
+    for match in _WORD.finditer(text):
+        languages = WORD_LANGUAGES.get(match.group().lower())
+        if languages is None:
+            continue
+        total += 1
+        for language in languages:
+            counts[language] = counts.get(language, 0) + 1
+        if total >= min_hits:
+            leader = max(counts, key=counts.get)
+            if counts[leader] >= min_hits and counts[leader] / total >= threshold and _is_unique_leader(counts, leader):
+                return leader, counts[leader] / total
+
+    if not counts:
+        return default, 0.0
+    leader = max(counts, key=counts.get)
+    if counts[leader] < min_hits or not _is_unique_leader(counts, leader):
+        return default, 0.0
+    return leader, counts[leader] / total
+
+
+def _is_unique_leader(counts, leader):
+    top = counts[leader]
+    return all(count < top for language, count in counts.items() if language != leader)
+
+
+def detect_line_language(line, default=None):
+    """Language of a single short line, or default when it has no clear answer"""
+    return detect_language(line, min_hits=1, threshold=0.5, default=default)[0]
+
+
+def has_words(text):
+    """True if text contains at least one word (not just numbers or symbols)"""
+    return _WORD.search(text) is not None
+
+
+def needs_translation(line, target_lang="en", default="es"):
+    """True if the line has words and is not already in the target language
+
+    Lines with no recognised words are assumed to be in `default`.
+    """
+    if not has_words(line):
+        return False
+    return detect_line_language(line, default=default) != target_lang.lower()
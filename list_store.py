@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Local store for shopping lists shared between stages
+Each save is a run of one list, kept as structured, indexed rows in
+SQLite (WAL mode), so many lists can be written and read concurrently
+from the same working directory
+"""
+
+import threading
+import time
+import uuid
+from itertools import islice
+
+from grocery_parser import GroceryLine, parse_grocery_line
+from sqlite_cache import connect_sqlite
+
+DEFAULT_STORE_PATH = "shopping_lists.db"
+DEFAULT_LIST_ID = "default"
+SAVE_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    list_id TEXT NOT NULL,
+    source TEXT,
+    document TEXT,
+    created_at REAL NOT NULL,
+    item_count INTEGER  -- NULL while the run is still being written
+);
+CREATE INDEX IF NOT EXISTS runs_list_created ON runs (list_id, created_at);
+CREATE TABLE IF NOT EXISTS items (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quantity REAL,
+    unit TEXT,
+    notes TEXT,
+    text TEXT NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+CREATE INDEX IF NOT EXISTS items_name ON items (name);
+"""
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+def _as_record(item):
+    """GroceryLine for a stored item; strings are parsed like list entries"""
+    if isinstance(item, GroceryLine):
+        return item
+    record = parse_grocery_line(str(item))
+    return record if record is not None else GroceryLine(str(item), None, None, None, str(item))
+
+
+class ListStore:
+    """Runs of shopping lists keyed by list ID and run ID
+
+    ``document`` keeps the full list text (e.g. the translated document)
+    next to its parsed items. Reads default to the latest run of a list.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def save_list(self, list_id, items, run_id=None, source=None, document=None):
+        """Store a new run of a list, returns its run ID
+
+        Items can be GroceryLine records or entry strings like "Milk - 2 liters",
+        in a list or any iterable; iterables are consumed and written in
+        chunks, so a streamed list is never held in memory. The run only
+        becomes visible to latest_run() once every item is written.
+        """
+        run_id = run_id or new_run_id()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, list_id, source, document, created_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, list_id, source, document, time.time()),
+            )
+
+        records = map(_as_record, items)
+        count = 0
+        try:
+            while True:
+                rows = [
+                    (run_id, position, record.name, record.quantity, record.unit, record.notes, record.text)
+                    for position, record in enumerate(islice(records, SAVE_CHUNK_SIZE), count)
+                ]
+                if not rows:
+                    break
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO items (run_id, position, name, quantity, unit, notes, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                count += len(rows)
+        except BaseException:
+            self.delete_run(run_id)
+            raise
+
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET item_count = ? WHERE run_id = ?", (count, run_id))
+        return run_id
+
+    def latest_run(self, list_id=DEFAULT_LIST_ID):
+        """Run ID of the most recent complete save of a list, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE list_id = ? AND item_count IS NOT NULL"
+                " ORDER BY created_at DESC LIMIT 1",
+                (list_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def count_items(self, run_id):
+        """Number of items in a complete run, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT item_count FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_items(self, list_id=DEFAULT_LIST_ID, run_id=None):
+        """GroceryLine records of a run (the latest run of list_id by default)"""
+        run_id = run_id or self.latest_run(list_id)
+        if run_id is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, quantity, unit, notes, text FROM items WHERE run_id = ? ORDER BY position", (run_id,)
+            ).fetchall()
+        return [GroceryLine(*row) for row in rows]
+
+    def load_document(self, list_id=DEFAULT_LIST_ID, run_id=None):
+        """Stored document text of a run, or None"""
+        run_id = run_id or self.latest_run(list_id)
+        if run_id is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT document FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def list_ids(self):
+        """Every list ID with at least one complete run"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT list_id FROM runs WHERE item_count IS NOT NULL ORDER BY list_id")
+            return [row[0] for row in rows]
+
+    def delete_run(self, run_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+
+
+def get_list_store():
+    """The ListStore in the working directory, shared by the whole process"""
+    global _store
+    if _store is None:
+        _store = ListStore()
+    return _store
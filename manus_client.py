@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Async Manus client
+Drives many Notion fetch tasks from one event loop over a shared connection pool
+"""
+
+import asyncio
+
+import manus_final_system
+from async_http import get_http_client, retry_after_seconds
+from manus_webhook import CALLBACK_DEADLINE, CompletionListener
+from poll_scheduler import BackoffPolicy, PollScheduler, retry_hint
+
+MANUS_TIMEOUT = 30
+MANUS_CONCURRENCY = 50
+
+
+class AsyncManusClient:
+    """Async version of the create / poll / fetch calls in manus_final_system
+
+    Every method keeps the return values of its blocking counterpart, so
+    callers can switch without changing how results are handled. Without
+    a client, requests go through the shared async_http client with the
+    Manus host capped at ``concurrency`` requests in flight. That client is
+    looked up per request, so the object can be built outside a running
+    event loop.
+
+    With a CompletionListener, tasks are created with its callback URL and
+    completion is awaited as an event; polling only starts for tasks whose
+    event has not arrived within callback_deadline seconds.
+    """
+
+    def __init__(self, api_key=None, base_url=None, client=None, concurrency=MANUS_CONCURRENCY, policy=None,
+                 listener=None, callback_deadline=CALLBACK_DEADLINE):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.listener = listener
+        self.callback_deadline = callback_deadline
+        self.concurrency = concurrency
+        self._client = client
+        self.scheduler = PollScheduler(self.check_task, policy or BackoffPolicy(), max_in_flight=concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def client(self):
+        """The caller's client, or the shared one of the running event loop"""
+        if self._client is not None:
+            return self._client
+        client = get_http_client()
+        client.limit_host(self._url(""), self.concurrency)
+        return client
+
+    async def close(self):
+        """Kept for API compatibility; the shared client is closed by close_http_client()"""
+
+    def _url(self, path):
+        return f"{self.base_url or manus_final_system.MANUS_BASE_URL}{path}"
+
+    def _headers(self):
+        headers = manus_final_system.manus_headers()
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    async def create_task(self, task_payload=None):
+        """Create a Manus task, returns the task ID or None"""
+        payload = dict(task_payload or manus_final_system.build_notion_task_payload())
+        if self.listener is not None:
+            payload.setdefault("callback_url", self.listener.callback_url)
+        try:
+            # Not retried: Manus may have accepted the task before the error,
+            # and a retry would create a second billable task
+            response = await self.client.post(
+                self._url("/tasks"), headers=self._headers(), json=payload, timeout=MANUS_TIMEOUT, retry=False,
+            )
+            if response.status == 201:
+                return response.json().get('id')
+            print(f"ERROR: Failed to create task: {response.status}")
+            print(f"Response: {response.text}")
+            return None
+        except Exception as e:
+            print(f"ERROR: Error creating Manus task: {e}")
+            return None
+
+    async def check_task(self, task_id):
+        """Return (status, task_data, retry_hint_seconds), status None on failure
+
+        The hint comes from a Retry-After header or a retry field in the body.
+        """
+        try:
+            response = await self.client.get(self._url(f"/tasks/{task_id}"), headers=self._headers(), timeout=MANUS_TIMEOUT)
+            hint = retry_after_seconds(response.headers)
+            if response.status == 200:
+                task_data = response.json()
+                return task_data.get('status'), task_data, hint if hint is not None else retry_hint(task_data)
+            print(f"ERROR: Failed to check task {task_id} status: {response.status}")
+            return None, None, None
+        except Exception as e:
+            print(f"ERROR: Error checking task {task_id} status: {e}")
+            return None, None, None
+
+    async def check_task_status(self, task_id):
+        """Return (status, task_data), or (None, None) on failure"""
+        status, task_data, _ = await self.check_task(task_id)
+        return status, task_data
+
+    async def fetch_task_result(self, task_id):
+        """Return the result data of a completed task, or None"""
+        try:
+            response = await self.client.get(self._url(f"/tasks/{task_id}/result"), headers=self._headers(), timeout=MANUS_TIMEOUT)
+            if response.status == 200:
+                return response.json()
+            print(f"ERROR: Failed to fetch task {task_id} result: {response.status}")
+            return None
+        except Exception as e:
+            print(f"ERROR: Error fetching task {task_id} result: {e}")
+            return None
+
+    async def poll_task_completion(self, task_id):
+        """Wait for the task via its callback event, else the shared poll loop"""
+        if self.listener is not None:
+            event = await self.listener.wait_for(task_id, self.callback_deadline)
+            if event is not None:
+                if event.get("status") == "completed":
+                    return event
+                print(f"ERROR: Task {task_id} failed")
+                return None
+            print(f"WARNING: No callback for task {task_id} after {self.callback_deadline}s, polling instead")
+            task_data = await self.scheduler.wait(task_id)
+            self.listener.forget(task_id)
+            return task_data
+        return await self.scheduler.wait(task_id)
+
+    async def run_task(self, task_payload=None):
+        """Create a task, wait for it and return its result data (or None)"""
+        task_id = await self.create_task(task_payload)
+        if not task_id:
+            return None
+        if not await self.poll_task_completion(task_id):
+            return None
+        return await self.fetch_task_result(task_id)
+
+    async def run_many(self, task_payloads):
+        """Run many tasks concurrently, results come back in payload order"""
+        return await asyncio.gather(*(self.run_task(payload) for payload in task_payloads))
+
+
+async def fetch_notion_lists(task_payloads, policy=None, callback_public_url=None):
+    """Fetch several Notion lists through Manus and return their item lists
+
+    Passing callback_public_url (an address Manus can reach that forwards
+    to this process) switches completion from polling to callbacks.
+    """
+    task_payloads = list(task_payloads)
+    if callback_public_url is None:
+        async with AsyncManusClient(policy=policy) as client:
+            results = await client.run_many(task_payloads)
+    else:
+        async with CompletionListener(host="0.0.0.0", public_url=callback_public_url) as listener:
+            async with AsyncManusClient(policy=policy, listener=listener) as client:
+                results = await client.run_many(task_payloads)
+    database_ids = [(payload or {}).get("parameters", {}).get("database_id") for payload in task_payloads]
+    return [
+        manus_final_system.process_notion_data(result, database_id=database_id) if result else []
+        for result, database_id in zip(results, database_ids)
+    ]
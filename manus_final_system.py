@@ -4,11 +4,18 @@ Manus Final System - Ready for Production
 Creates a task in Manus to fetch data from Notion, then polls for completion
 """
 
+import asyncio
 import requests
 import json
 import time
 import os
 
+import instrumentation
+from grocery_parser import iter_grocery_lines
+from list_store import DEFAULT_LIST_ID, get_list_store
+from notion_stream import iter_notion_items, notion_page_fetcher
+from poll_scheduler import BackoffPolicy, retry_hint
+
 # Set environment variable to handle Unicode properly
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 
@@ -17,23 +24,35 @@ os.environ['PYTHONIOENCODING'] = 'utf-8'
 MANUS_API_KEY = "YOUR_MANUS_API_KEY_HERE"
 MANUS_BASE_URL = "https://api.manus.ai/v1"
 
-def create_manus_task():
-    """Create a task in Manus to fetch data from Notion"""
-    
-    headers = {
+# Notion database the task reads, also used to page through long results
+NOTION_DATABASE_ID = "your_notion_database_id"  # Replace with your actual Notion database ID
+NOTION_TOKEN = "your_notion_integration_token"  # Replace with your Notion token
+
+# Reused across calls so polling shares one keep-alive connection
+_manus_session = instrumentation.instrument_session(requests.Session())
+
+def manus_headers():
+    """Request headers for the Manus API"""
+    return {
         "Authorization": f"Bearer {MANUS_API_KEY}",
         "Content-Type": "application/json"
     }
-    
-    # Task payload for fetching from Notion
-    task_payload = {
+
+def build_notion_task_payload(callback_url=None, database_id=None):
+    """Task payload for fetching the grocery list from Notion
+    
+    With a callback_url Manus posts the completion event there, so the
+    caller does not have to poll for it. database_id overrides the
+    configured database, for fetching many lists in one run.
+    """
+    payload = {
         "name": "Fetch Notion Grocery List",
         "description": "Fetch grocery list data from Notion database",
         "type": "data_fetch",
         "source": "notion",
         "parameters": {
-            "database_id": "your_notion_database_id",  # Replace with your actual Notion database ID
-            "notion_token": "your_notion_integration_token",  # Replace with your Notion token
+            "database_id": NOTION_DATABASE_ID,
+            "notion_token": NOTION_TOKEN,
             "fields": ["Item", "Quantity", "Category", "Notes"],
             "filter": {
                 "property": "Status",
@@ -45,11 +64,22 @@ def create_manus_task():
         "priority": "high",
         "timeout": 300
     }
+    if database_id:
+        payload["parameters"]["database_id"] = database_id
+    if callback_url:
+        payload["callback_url"] = callback_url
+    return payload
+
+def create_manus_task(callback_url=None):
+    """Create a task in Manus to fetch data from Notion"""
+    
+    headers = manus_headers()
+    task_payload = build_notion_task_payload(callback_url)
     
     try:
         print("Creating Manus task for Notion data fetch...")
         
-        response = requests.post(
+        response = _manus_session.post(
             f"{MANUS_BASE_URL}/tasks",
             headers=headers,
             json=task_payload,
@@ -73,13 +103,10 @@ def create_manus_task():
 def check_task_status(task_id):
     """Check if the Manus task is finished"""
     
-    headers = {
-        "Authorization": f"Bearer {MANUS_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    headers = manus_headers()
     
     try:
-        response = requests.get(
+        response = _manus_session.get(
             f"{MANUS_BASE_URL}/tasks/{task_id}",
             headers=headers,
             timeout=30
@@ -101,13 +128,10 @@ def check_task_status(task_id):
 def fetch_task_result(task_id):
     """Fetch the result data from the completed Manus task"""
     
-    headers = {
-        "Authorization": f"Bearer {MANUS_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    headers = manus_headers()
     
     try:
-        response = requests.get(
+        response = _manus_session.get(
             f"{MANUS_BASE_URL}/tasks/{task_id}/result",
             headers=headers,
             timeout=30
@@ -125,14 +149,27 @@ def fetch_task_result(task_id):
         print(f"ERROR: Error fetching task result: {e}")
         return None
 
-def poll_task_completion(task_id, max_attempts=30, poll_interval=10):
-    """Poll the task until completion"""
+def poll_task_completion(task_id, max_attempts=30, poll_interval=10, initial_interval=0.5):
+    """Poll the task until completion
+    
+    Waits start at initial_interval and back off exponentially with jitter
+    up to poll_interval; a server retry hint in the status payload wins.
+    Polling stops at a deadline of max_attempts * poll_interval seconds,
+    the longest the fixed-interval poll used to wait, however many
+    (shorter) polls fit in it.
+    """
+    
+    timeout = max_attempts * poll_interval
+    policy = BackoffPolicy(initial=initial_interval, max_interval=poll_interval, timeout=timeout)
+    deadline = time.monotonic() + policy.timeout
     
     print(f"Polling task {task_id} for completion...")
-    print(f"Max attempts: {max_attempts}, Poll interval: {poll_interval}s")
+    print(f"Timeout: {timeout:g}s, Poll interval: {initial_interval}s-{poll_interval}s")
     
-    for attempt in range(1, max_attempts + 1):
-        print(f"\n--- Attempt {attempt}/{max_attempts} ---")
+    attempt = 0
+    while True:
+        attempt += 1
+        print(f"\n--- Attempt {attempt} ---")
         
         status, task_data = check_task_status(task_id)
         
@@ -148,92 +185,125 @@ def poll_task_completion(task_id, max_attempts=30, poll_interval=10):
             return None
         elif status in ["pending", "running", "processing"]:
             print(f"WAITING: Task is {status}, waiting...")
-            if attempt < max_attempts:
-                print(f"Waiting {poll_interval} seconds before next check...")
-                time.sleep(poll_interval)
         else:
             print(f"WARNING: Unknown status: {status}")
-            if attempt < max_attempts:
-                print(f"Waiting {poll_interval} seconds before next check...")
-                time.sleep(poll_interval)
-    
-    print(f"TIMEOUT: Task did not complete within {max_attempts * poll_interval} seconds")
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # The last poll lands on the deadline rather than skipping past it
+        delay = min(policy.next_delay(attempt - 1, retry_hint(task_data)), remaining)
+        print(f"Waiting {delay:.1f} seconds before next check...")
+        time.sleep(delay)
+    
+    print(f"TIMEOUT: Task did not complete within {timeout:g} seconds")
     return None
 
-def process_notion_data(notion_data):
+def iter_notion_data(notion_data, database_id=None):
+    """Lazily yield a GroceryLine per item in fetched Notion data
+    
+    Notion query results are followed page by page through next_cursor
+    (database_id defaults to NOTION_DATABASE_ID), with the same filter
+    as the Manus task so the cursor stays valid. If a later page fails,
+    the error is printed and the items already yielded are kept. A plain
+    list of entries is parsed line by line.
+    """
+    if isinstance(notion_data, dict) and 'results' in notion_data:
+        database_id = database_id or NOTION_DATABASE_ID
+        query = {"filter": build_notion_task_payload()["parameters"]["filter"]}
+        fetch_page = notion_page_fetcher(database_id, NOTION_TOKEN, query=query)
+        try:
+            yield from iter_notion_items(notion_data, fetch_page, database_id)
+        except requests.RequestException as e:
+            print(f"ERROR: Failed to fetch the next Notion page, list is truncated: {e}")
+    elif isinstance(notion_data, list):
+        # Direct list of items, possibly with list markers
+        yield from iter_grocery_lines(str(entry) for entry in notion_data)
+    else:
+        # Add custom extraction logic here based on your Notion structure
+        print("WARNING: Unknown Notion data format, no items extracted")
+
+def process_notion_data(notion_data, verbose=True, database_id=None):
     """Process the fetched Notion data into a shopping list"""
     
     if not notion_data:
-        print("ERROR: No data to process")
+        if verbose:
+            print("ERROR: No data to process")
         return []
     
-    print("Processing Notion data...")
-    
-    # Extract items from Notion data
-    items = []
+    if verbose:
+        print("Processing Notion data...")
     
-    # Handle different possible data structures from Notion
-    if 'results' in notion_data:
-        # Standard Notion API response
-        for item in notion_data['results']:
-            properties = item.get('properties', {})
-            
-            # Extract item name
-            item_name = ""
-            if 'Item' in properties:
-                item_name = properties['Item'].get('title', [{}])[0].get('text', {}).get('content', '')
-            elif 'Name' in properties:
-                item_name = properties['Name'].get('title', [{}])[0].get('text', {}).get('content', '')
-            
-            # Extract quantity
-            quantity = ""
-            if 'Quantity' in properties:
-                quantity = properties['Quantity'].get('rich_text', [{}])[0].get('text', {}).get('content', '')
-            elif 'Amount' in properties:
-                quantity = properties['Amount'].get('rich_text', [{}])[0].get('text', {}).get('content', '')
-            
-            if item_name:
-                if quantity:
-                    items.append(f"{item_name} - {quantity}")
-                else:
-                    items.append(item_name)
-    
-    elif isinstance(notion_data, list):
-        # Direct list of items
-        items = notion_data
+    items = [record.text for record in iter_notion_data(notion_data, database_id)]
     
-    else:
-        # Try to extract items from other formats
-        print("WARNING: Unknown data format, attempting to extract items...")
-        # Add custom extraction logic here based on your Notion structure
-    
-    print(f"Extracted {len(items)} items from Notion:")
-    for i, item in enumerate(items, 1):
-        print(f"  {i}. {item}")
+    if verbose:
+        print(f"Extracted {len(items)} items from Notion:")
+        for i, item in enumerate(items, 1):
+            print(f"  {i}. {item}")
     
     return items
 
-def save_shopping_list(items):
-    """Save the processed shopping list to files"""
+def save_shopping_list(items, list_id=DEFAULT_LIST_ID):
+    """Save the processed shopping list to the local list store
     
-    if not items:
+    items can be a list or a lazy iterable, which is written as it is read.
+    """
+    
+    store = get_list_store()
+    run_id = store.save_list(list_id, items, source="notion")
+    count = store.count_items(run_id)
+    if not count:
+        store.delete_run(run_id)
         print("ERROR: No items to save")
-        return
+        return None
     
-    # Save to grocery list file
-    with open('grocery_list_english.txt', 'w', encoding='utf-8') as f:
-        f.write("Shopping List - Notion\n\n")
-        for i, item in enumerate(items, 1):
-            f.write(f"{i}. {item}\n")
+    print(f"SUCCESS: Saved {count} items to the list store:")
+    print(f"  - list: {list_id}")
+    print(f"  - run: {run_id}")
+    return run_id
+
+async def fetch_notion_result():
+    """Create the Notion fetch task, wait for it and return its result data
     
-    # Save to shopping items file
-    with open('shopping_items.txt', 'w', encoding='utf-8') as f:
-        for item in items:
-            f.write(item + '\n')
+    Runs over the shared async HTTP client (see async_http), so it can
+    share an event loop and connection pool with other work.
+    """
+    from async_http import close_http_client
+    from manus_client import AsyncManusClient
     
-    print("SUCCESS: Shopping list saved to files:")
-    print("  - grocery_list_english.txt")
-    print("  - shopping_items.txt")
+    try:
+        async with AsyncManusClient() as client:
+            # Step 1: Create Manus task
+            print("\n1. CREATING MANUS TASK")
+            print("-" * 30)
+            task_id = await client.create_task()
+            
+            if not task_id:
+                print("ERROR: Failed to create Manus task. Exiting.")
+                print("Please check your Manus API key and try again.")
+                return None
+            
+            # Step 2: Poll for completion
+            print("\n2. POLLING FOR COMPLETION")
+            print("-" * 30)
+            completed_task = await client.poll_task_completion(task_id)
+            
+            if not completed_task:
+                print("ERROR: Task did not complete successfully. Exiting.")
+                return None
+            
+            # Step 3: Fetch result data
+            print("\n3. FETCHING RESULT DATA")
+            print("-" * 30)
+            result_data = await client.fetch_task_result(task_id)
+            
+            if not result_data:
+                print("ERROR: Failed to fetch result data. Exiting.")
+                return None
+            
+            return result_data
+    finally:
+        await close_http_client()
 
 def main():
     """Main function to run the Manus Notion fetcher"""
@@ -250,55 +320,30 @@ def main():
     print("3. A Notion integration token")
     print("=" * 60)
     
-    # Step 1: Create Manus task
-    print("\n1. CREATING MANUS TASK")
-    print("-" * 30)
-    task_id = create_manus_task()
-    
-    if not task_id:
-        print("ERROR: Failed to create Manus task. Exiting.")
-        print("Please check your Manus API key and try again.")
-        return
-    
-    # Step 2: Poll for completion
-    print("\n2. POLLING FOR COMPLETION")
-    print("-" * 30)
-    completed_task = poll_task_completion(task_id)
-    
-    if not completed_task:
-        print("ERROR: Task did not complete successfully. Exiting.")
-        return
-    
-    # Step 3: Fetch result data
-    print("\n3. FETCHING RESULT DATA")
-    print("-" * 30)
-    result_data = fetch_task_result(task_id)
-    
+    result_data = asyncio.run(fetch_notion_result())
     if not result_data:
-        print("ERROR: Failed to fetch result data. Exiting.")
         return
     
-    # Step 4: Process the data
-    print("\n4. PROCESSING NOTION DATA")
+    # Step 4 + 5: Stream the Notion pages straight into the list store
+    print("\n4. PROCESSING AND SAVING NOTION DATA")
     print("-" * 30)
-    items = process_notion_data(result_data)
+    run_id = save_shopping_list(iter_notion_data(result_data))
     
-    # Step 5: Save shopping list
-    print("\n5. SAVING SHOPPING LIST")
-    print("-" * 30)
-    save_shopping_list(items)
+    if not run_id:
+        print("ERROR: No items found in Notion data. Exiting.")
+        return
     
     print("\n" + "=" * 60)
     print("MANUS NOTION FETCHER COMPLETE")
     print("=" * 60)
-    print(f"Successfully processed {len(items)} items from Notion!")
+    print(f"Successfully processed {get_list_store().count_items(run_id)} items from Notion!")
     print("=" * 60)
     
     print("\n" + "=" * 60)
     print("NEXT STEPS")
     print("=" * 60)
     print("Now you can run the shopping system with the fetched data:")
-    print("python google_docs_shopping_final.py")
+    print("python browser_shop.py")
     print("=" * 60)
 
 if __name__ == "__main__":
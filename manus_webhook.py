@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Embedded listener for Manus task completion callbacks
+Tasks created with a callback URL report back here instead of being polled
+"""
+
+import asyncio
+import secrets
+
+from aiohttp import web
+
+CALLBACK_PATH = "/manus/callback"
+CALLBACK_DEADLINE = 60
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+class CompletionListener:
+    """Small aiohttp server that collects task completion events
+
+    ``public_url`` is the address Manus can reach (e.g. behind a tunnel);
+    it defaults to the local bind address. Each callback URL carries a
+    random token and events without it are rejected.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, public_url=None):
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.token = secrets.token_urlsafe(16)
+        self.stats = {"events": 0, "rejected": 0}
+        self._events = {}
+        self._waiters = {}
+        self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(CALLBACK_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        if self.public_url is None:
+            self.public_url = f"http://{self.host}:{self.port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def callback_url(self):
+        return f"{self.public_url.rstrip('/')}{CALLBACK_PATH}?token={self.token}"
+
+    async def _handle(self, request):
+        if request.query.get("token") != self.token:
+            self.stats["rejected"] += 1
+            return web.json_response({"error": "invalid token"}, status=403)
+
+        try:
+            event = await request.json()
+        except ValueError:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+
+        task_id = event.get("task_id") or event.get("id")
+        if not task_id or event.get("status") not in TERMINAL_STATUSES:
+            return web.json_response({"ok": True})
+
+        self.stats["events"] += 1
+        waiter = self._waiters.pop(task_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(event)
+        else:
+            # The event beat the waiter, keep it until someone asks
+            self._events[task_id] = event
+        return web.json_response({"ok": True})
+
+    async def wait_for(self, task_id, timeout=CALLBACK_DEADLINE):
+        """Return the completion event for task_id, or None after timeout"""
+        if task_id in self._events:
+            return self._events.pop(task_id)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[task_id] = waiter
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._waiters.pop(task_id, None)
+
+    def forget(self, task_id):
+        """Drop any stored event for a task that was resolved another way"""
+        self._events.pop(task_id, None)
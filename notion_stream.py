@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for Notion database query results
+Follows has_more / next_cursor pagination lazily and extracts items
+through a property schema resolved once per database
+"""
+
+import requests
+
+import instrumentation
+from grocery_parser import grocery_line_from_parts
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+NOTION_PAGE_SIZE = 100  # the most Notion returns per query
+
+# Property names tried, in order, for the item name and its quantity
+NAME_PROPERTIES = ("Item", "Name")
+QUANTITY_PROPERTIES = ("Quantity", "Amount")
+
+# Reused across pages so a long database shares one keep-alive connection
+_notion_session = instrumentation.instrument_session(requests.Session())
+_schemas = {}
+
+
+def _text_value(value):
+    return ''.join(
+        part.get('plain_text') or part.get('text', {}).get('content', '')
+        for part in value or ()
+    )
+
+
+# Notion property type -> function of the typed value returning text
+_EXTRACTORS = {
+    "title": _text_value,
+    "rich_text": _text_value,
+    "number": lambda value: '' if value is None else f"{value:g}",
+    "select": lambda value: (value or {}).get('name', ''),
+    "formula": lambda value: str((value or {}).get((value or {}).get('type'), '') or ''),
+}
+
+
+class NotionSchema:
+    """Which properties hold an item's name and quantity, and how to read them"""
+
+    __slots__ = ('name_property', 'name_type', 'quantity_property', 'quantity_type')
+
+    def __init__(self, name_property, name_type, quantity_property=None, quantity_type=None):
+        self.name_property = name_property
+        self.name_type = name_type
+        self.quantity_property = quantity_property
+        self.quantity_type = quantity_type
+
+    @classmethod
+    def from_properties(cls, properties):
+        """Resolve the schema from one row's (or the database's) properties"""
+        def pick(candidates, fallback_type=None):
+            for name in candidates:
+                if name in properties:
+                    return name, properties[name].get('type')
+            if fallback_type:
+                for name, prop in properties.items():
+                    if prop.get('type') == fallback_type:
+                        return name, fallback_type
+            return None, None
+
+        name_property, name_type = pick(NAME_PROPERTIES, fallback_type="title")
+        quantity_property, quantity_type = pick(QUANTITY_PROPERTIES)
+        # Older payloads omit "type"; the property names imply it
+        return cls(
+            name_property, name_type or "title",
+            quantity_property, quantity_type or (quantity_property and "rich_text"),
+        )
+
+    def _read(self, properties, name, kind):
+        prop = properties.get(name)
+        if not prop:
+            return ''
+        extractor = _EXTRACTORS.get(kind)
+        return extractor(prop.get(kind)) if extractor else ''
+
+    def extract(self, row):
+        """GroceryLine for one result row, or None if it has no name"""
+        if self.name_property is None:
+            return None
+        properties = row.get('properties', {})
+        name = self._read(properties, self.name_property, self.name_type).strip()
+        if not name:
+            return None
+        quantity = self._read(properties, self.quantity_property, self.quantity_type) if self.quantity_property else ''
+        return grocery_line_from_parts(name, quantity)
+
+
+def notion_page_fetcher(database_id, token, query=None, page_size=NOTION_PAGE_SIZE):
+    """Return fetch_page(cursor) that queries the next page of a database"""
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+    }
+
+    def fetch_page(cursor):
+        body = dict(query or {}, page_size=page_size)
+        if cursor:
+            body["start_cursor"] = cursor
+        response = _notion_session.post(
+            f"{NOTION_API_URL}/databases/{database_id}/query", headers=headers, json=body, timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+
+    return fetch_page
+
+
+def iter_notion_pages(first_page, fetch_page=None):
+    """Yield first_page and then every following page, one request at a time
+
+    Without fetch_page only first_page is yielded, even if it has more.
+    """
+    page = first_page
+    while page is not None:
+        yield page
+        cursor = page.get('next_cursor')
+        if not page.get('has_more') or not cursor:
+            return
+        if fetch_page is None:
+            print("WARNING: Notion results have more pages but no way to fetch them; list is truncated")
+            return
+        page = fetch_page(cursor)
+
+
+def iter_notion_items(first_page, fetch_page=None, database_id=None):
+    """Lazily yield a GroceryLine per named row across all pages
+
+    The schema is resolved from the first row and kept per database_id,
+    so later calls for the same database skip resolution.
+    """
+    schema = _schemas.get(database_id) if database_id else None
+    for page in iter_notion_pages(first_page, fetch_page):
+        for row in page.get('results', ()):
+            if schema is None:
+                schema = NotionSchema.from_properties(row.get('properties', {}))
+                if database_id:
+                    _schemas[database_id] = schema
+            record = schema.extract(row)
+            if record is not None:
+                yield record
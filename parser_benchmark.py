@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the grocery line parser
+Compares the structured parse (name, quantity, unit, notes) against the
+name-only split the loaders used before; the split does far less work,
+so expect it to stay several times faster
+Usage: python parser_benchmark.py [lines] [repeats]
+"""
+
+import random
+import sys
+import time
+
+from grocery_parser import iter_grocery_lines
+
+SAMPLE_LINES = [
+    "{n}. Leche - 2 litros",
+    "{n}. Huevos - 1 docena",
+    "{n}. Milk - 1 gallon (organic)",
+    "- 2 liters milk",
+    "* 12 eggs",
+    "{n}) Apples - 1/2 kilo",
+    "{n}. Flour - 1 1/2 cups sifted",
+    "- bread",
+    "{n}. Queso - 200 gramos",
+    "",
+    "Shopping List - Week {n}",
+]
+
+
+def make_lines(count, seed=42):
+    """Synthetic shopping list with a realistic mix of line shapes"""
+    rng = random.Random(seed)
+    return [rng.choice(SAMPLE_LINES).format(n=i) for i in range(1, count + 1)]
+
+
+def split_baseline(lines):
+    """The hand-rolled split the loaders used before the shared parser"""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('Shopping List') and not line.startswith('Grocery'):
+            if '. ' in line:
+                item = line.split('. ', 1)[1]
+                if ' - ' in item:
+                    item = item.split(' - ')[0]
+                if item:
+                    items.append(item.strip())
+    return items
+
+
+def best_time(func, lines, repeats):
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func(lines)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lines = make_lines(count)
+
+    print("=" * 60)
+    print(f"GROCERY PARSER BENCHMARK ({count} lines, best of {repeats})")
+    print("=" * 60)
+
+    parsed_time, records = best_time(lambda ls: list(iter_grocery_lines(ls)), lines, repeats)
+    baseline_time, names = best_time(split_baseline, lines, repeats)
+
+    print(f"Shared parser:  {parsed_time:.3f}s  {count / parsed_time:>12,.0f} lines/s  {len(records)} records")
+    print(f"Split baseline: {baseline_time:.3f}s  {count / baseline_time:>12,.0f} lines/s  {len(names)} names (no quantities)")
+    with_quantity = sum(1 for record in records if record.quantity is not None)
+    print(f"Structured quantities found: {with_quantity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the shopping pipeline against local stub APIs
+Runs the Google Docs flow (without the browser), the Manus Notion fetch
+and the Dedalus plan request on synthetic lists, each run in a fresh
+process and working directory, and reports throughput, p50/p99 latency
+and peak memory. Saved reports can be compared to catch regressions.
+
+Usage:
+  python pipeline_benchmark.py run [sizes] [option=value ...]
+      sizes    comma separated item counts (default 10,1000,100000)
+      options  scenarios=docs,manus,dedalus repeats=3 latency=0.02
+               error_rate=0.01 manus_delay=0.5 out=report.json
+  python pipeline_benchmark.py compare <baseline.json> <current.json> [tolerance=0.1]
+"""
+
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit
+
+from stub_servers import (
+    create_dedalus_app,
+    create_deepl_app,
+    create_docs_app,
+    create_manus_app,
+    start_stub_server,
+    synthetic_grocery_document,
+)
+
+SCENARIOS = ("docs", "manus", "dedalus")
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = 0.10  # relative change that counts as a regression
+CHILD_TIMEOUT = 1800
+
+# (metric, higher is better) checked by compare_reports
+COMPARED_METRICS = (
+    ("throughput", True),
+    ("wall_s.p50", False),
+    ("wall_s.p99", False),
+    ("peak_memory_mb", False),
+)
+
+
+class StubCluster:
+    """DeepL, Manus, Dedalus and Docs stubs served from one background event loop"""
+
+    def __init__(self, items, latency=0.0, error_rate=0.0, manus_delay=0.5):
+        self.items = items
+        self.latency = latency
+        self.error_rate = error_rate
+        self.manus_delay = manus_delay
+        self.apps = {}
+        self.urls = {}
+        self._runners = []
+        self._loop = None
+        self._thread = None
+
+    async def _start(self):
+        self.apps = {
+            'deepl': create_deepl_app(self.latency, self.error_rate),
+            'manus': create_manus_app(self.manus_delay, self.items, self.latency, self.error_rate),
+            'dedalus': create_dedalus_app(self.latency, self.error_rate),
+            'docs': create_docs_app(self.latency, self.error_rate),
+        }
+        for name, app in self.apps.items():
+            runner, self.urls[name] = await start_stub_server(app)
+            self._runners.append(runner)
+
+    async def _stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def hosts(self):
+        """Stub name by host:port, to label HTTP metrics"""
+        return {urlsplit(url).netloc: name for name, url in self.urls.items()}
+
+    def stats(self):
+        return {name: dict(app['stats']) for name, app in self.apps.items()}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0..100), None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _latest_item_count():
+    from list_store import get_list_store
+    store = get_list_store()
+    run_id = store.latest_run()
+    return (store.count_items(run_id) or 0) if run_id else 0
+
+
+def _run_docs(items, urls):
+    """Docs flow without the browser, returns (items stored, fallback used)"""
+    import translate_grocery_list
+    from async_http import close_http_client
+    from google_docs_shopping_final import run_google_docs_shopping_final
+
+    translate_grocery_list.DEEPL_API_URL = f"{urls['deepl']}/v2/translate"
+
+    async def run():
+        try:
+            return await run_google_docs_shopping_final(doc_url=f"{urls['docs']}/document/d/items-{items}/edit", shop=False)
+        finally:
+            await close_http_client()
+
+    outcome = asyncio.run(run())
+    # The sample list or demo items stand in for a failed run, not a result
+    return _latest_item_count(), outcome["fallback"] if outcome else "no items loaded"
+
+
+def _run_manus(items, urls):
+    import manus_final_system
+
+    manus_final_system.MANUS_BASE_URL = urls['manus']
+    manus_final_system.main()
+    return _latest_item_count(), None
+
+
+def _run_dedalus(items, urls):
+    import browser_shop
+    from async_http import close_http_client
+    from grocery_parser import iter_grocery_lines
+
+    browser_shop.DEDALUS_BASE_URL = urls['dedalus']
+    names = [record.text for record in iter_grocery_lines(synthetic_grocery_document(items).splitlines())]
+
+    async def run():
+        try:
+            return await browser_shop.fetch_dedalus_plan(names)
+        finally:
+            await close_http_client()
+
+    return (len(names) if asyncio.run(run()).get("success") else 0), None
+
+
+_SCENARIO_RUNNERS = {
+    "docs": _run_docs,
+    "manus": _run_manus,
+    "dedalus": _run_dedalus,
+}
+
+
+def run_child(config):
+    """One measured scenario run; prints its result as JSON on the last line
+
+    "fallback" names the stand-in data a run used instead of its input,
+    if any; such a run counts as failed.
+    """
+    import instrumentation
+
+    instrumentation.enable(config['trace'])
+    result = {"processed": 0, "fallback": None, "error": None}
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            result["processed"], result["fallback"] = _SCENARIO_RUNNERS[config['scenario']](config['items'], config['urls'])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["wall_s"] = time.perf_counter() - started
+    result["cpu_s"] = time.process_time() - cpu_started
+    result["peak_memory_mb"] = _peak_memory_mb()
+    instrumentation.disable()
+    print(json.dumps(result))
+
+
+def _spawn_child(scenario, items, urls):
+    """Run one scenario in a fresh process and working directory
+
+    Returns (child result, trace events). HOME points at the working
+    directory too, so every disk cache starts empty.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        config = {
+            "scenario": scenario,
+            "items": items,
+            "urls": urls,
+            "trace": os.path.join(workdir, "trace.jsonl"),
+        }
+        env = dict(os.environ, HOME=workdir, USERPROFILE=workdir)
+        env.pop("AI_SHOPPING_METRICS", None)
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "child", json.dumps(config)],
+                cwd=workdir, env=env, capture_output=True, text=True, timeout=CHILD_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            return {"error": f"timed out after {CHILD_TIMEOUT}s"}, []
+
+        lines = completed.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            stderr = completed.stderr.strip().splitlines()
+            return {"error": stderr[-1] if stderr else f"exit code {completed.returncode}"}, []
+
+        events = []
+        if os.path.exists(config["trace"]):
+            with open(config["trace"], 'r', encoding='utf-8') as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        return result, events
+
+
+def benchmark_scenario(scenario, items, stubs, repeats=DEFAULT_REPEATS):
+    """Run a scenario `repeats` times and summarize the runs"""
+    hosts = stubs.hosts()
+    walls, cpus, peaks, processed, errors = [], [], [], [], []
+    http = {}
+    stages = {}
+
+    for _ in range(repeats):
+        result, events = _spawn_child(scenario, items, stubs.urls)
+        if result.get("error"):
+            errors.append(result["error"])
+            continue
+        if result.get("fallback"):
+            errors.append(f"fell back to {result['fallback']}")
+            continue
+        if not result["processed"]:
+            # The scenario returned without doing anything, e.g. a rejected request
+            errors.append(f"processed 0 of {items} items")
+            continue
+        walls.append(result["wall_s"])
+        cpus.append(result["cpu_s"])
+        processed.append(result["processed"])
+        if result["peak_memory_mb"] is not None:
+            peaks.append(result["peak_memory_mb"])
+
+        run_stages = {}
+        for event in events:
+            if event["type"] == "http":
+                calls = http.setdefault(hosts.get(event["upstream"], event["upstream"]), {"latencies": [], "errors": 0})
+                calls["latencies"].append(event["seconds"])
+                calls["errors"] += event["status"] is None or event["status"] >= 500
+            elif event["type"] == "span":
+                run_stages[event["name"]] = run_stages.get(event["name"], 0.0) + event["wall_s"]
+        for name, seconds in run_stages.items():
+            stages.setdefault(name, []).append(seconds)
+
+    p50 = percentile(walls, 50)
+    return {
+        "scenario": scenario,
+        "items": items,
+        "repeats": repeats,
+        "completed": len(walls),
+        "processed": min(processed) if processed else 0,
+        "wall_s": {"p50": p50, "p99": percentile(walls, 99), "min": min(walls) if walls else None},
+        # Items actually processed, so a partial run is not reported at full speed
+        "throughput": min(processed) / p50 if p50 else None,
+        "cpu_s": percentile(cpus, 50),
+        "peak_memory_mb": max(peaks) if peaks else None,
+        "http": {
+            name: {
+                "requests": len(calls["latencies"]),
+                "errors": calls["errors"],
+                "p50_ms": percentile(calls["latencies"], 50) * 1000,
+                "p99_ms": percentile(calls["latencies"], 99) * 1000,
+            }
+            for name, calls in http.items()
+        },
+        "stages": {name: percentile(seconds, 50) for name, seconds in stages.items()},
+        "errors": errors,
+    }
+
+
+def print_result(result):
+    if not result["completed"]:
+        print(f"❌ {result['scenario']:<8} {result['items']:>7} items  failed: {result['errors'][0]}")
+        return
+    wall = result["wall_s"]
+    peak = result["peak_memory_mb"]
+    print(
+        f"📊 {result['scenario']:<8} {result['items']:>7} items  {result['throughput']:>10,.0f} items/s  "
+        f"p50 {wall['p50']:.3f}s  p99 {wall['p99']:.3f}s  "
+        f"peak {'n/a' if peak is None else f'{peak:.0f} MB'}  processed {result['processed']}"
+    )
+    for name, calls in result["http"].items():
+        print(
+            f"     {name:<8} {calls['requests']:>6} requests  {calls['errors']} errors  "
+            f"p50 {calls['p50_ms']:.1f}ms  p99 {calls['p99_ms']:.1f}ms"
+        )
+    if result["errors"]:
+        print(f"     ⚠️  {len(result['errors'])} failed run(s): {result['errors'][0]}")
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, scenarios=SCENARIOS, repeats=DEFAULT_REPEATS,
+                  latency=0.0, error_rate=0.0, manus_delay=0.5):
+    """Benchmark every scenario at every size, returns the report dict"""
+    results = []
+    for items in sizes:
+        with StubCluster(items, latency, error_rate, manus_delay) as stubs:
+            for scenario in scenarios:
+                result = benchmark_scenario(scenario, items, stubs, repeats)
+                print_result(result)
+                results.append(result)
+    return {
+        "created": time.time(),
+        "python": sys.version.split()[0],
+        "config": {
+            "sizes": list(sizes),
+            "scenarios": list(scenarios),
+            "repeats": repeats,
+            "latency": latency,
+            "error_rate": error_rate,
+            "manus_delay": manus_delay,
+        },
+        "results": results,
+    }
+
+
+def _metric(result, path):
+    value = result
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare_reports(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Compare matching results of two reports
+
+    Returns (rows, regressions); each row is (scenario, items, metric,
+    before, after, relative change). A regression is a change for the
+    worse larger than tolerance.
+    """
+    previous = {(result["scenario"], result["items"]): result for result in baseline["results"]}
+    rows = []
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["items"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            before = _metric(old, metric)
+            after = _metric(result, metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            row = (result["scenario"], result["items"], metric, before, after, change)
+            rows.append(row)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(row)
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, tolerance=DEFAULT_TOLERANCE):
+    print(f"{'scenario':<8} {'items':>7}  {'metric':<15} {'before':>12} {'after':>12} {'change':>8}")
+    for row in rows:
+        scenario, items, metric, before, after, change = row
+        flag = "  ❌" if row in regressions else ""
+        print(f"{scenario:<8} {items:>7}  {metric:<15} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {tolerance:.0%}")
+    else:
+        print(f"\n✅ No regressions beyond {tolerance:.0%}")
+
+
+def _parse_options(args, defaults):
+    options = dict(defaults)
+    positional = []
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if not sep:
+            positional.append(arg)
+        elif key in options:
+            options[key] = value
+        else:
+            raise ValueError(f"Unknown option: {arg}")
+    return positional, options
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "child":
+        run_child(json.loads(sys.argv[2]))
+        return
+
+    if command == "run":
+        try:
+            positional, options = _parse_options(sys.argv[2:], {
+                "scenarios": ",".join(SCENARIOS), "repeats": DEFAULT_REPEATS, "latency": 0.0,
+                "error_rate": 0.0, "manus_delay": 0.5, "out": None,
+            })
+            sizes = [int(size) for size in positional[0].split(',')] if positional else list(DEFAULT_SIZES)
+            scenarios = options["scenarios"].split(',')
+            unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+            if unknown:
+                raise ValueError(f"Unknown scenario: {', '.join(unknown)}")
+            config = (int(options["repeats"]), float(options["latency"]),
+                      float(options["error_rate"]), float(options["manus_delay"]))
+        except ValueError as e:
+            print(e)
+            return
+
+        print("=" * 60)
+        print(f"PIPELINE BENCHMARK (sizes {sizes}, {config[0]} run(s) each)")
+        print("=" * 60)
+        report = run_benchmark(sizes, scenarios, *config)
+        if options["out"]:
+            with open(options["out"], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nReport saved to {options['out']}")
+        return
+
+    if command == "compare" and len(sys.argv) >= 4:
+        try:
+            _, options = _parse_options(sys.argv[4:], {"tolerance": DEFAULT_TOLERANCE})
+            tolerance = float(options["tolerance"])
+        except ValueError as e:
+            print(e)
+            return
+        reports = []
+        for path in sys.argv[2:4]:
+            with open(path, 'r', encoding='utf-8') as f:
+                reports.append(json.load(f))
+        rows, regressions = compare_reports(*reports, tolerance)
+        print_comparison(rows, regressions, tolerance)
+        sys.exit(1 if regressions else 0)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
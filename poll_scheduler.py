@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling for long-running remote tasks
+Exponential backoff with jitter, server retry hints, and one timer loop
+(a heap keyed on next-poll time) shared by every task being polled
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+
+
+class BackoffPolicy:
+    """Poll intervals that start fast and back off exponentially
+
+    Each delay is min(max_interval, initial * factor ** attempt), spread by
+    +/- ``jitter`` so tasks created together drift apart. A server hint
+    replaces the computed delay (still capped at max_interval).
+    """
+
+    def __init__(self, initial=0.5, factor=2.0, max_interval=10.0, jitter=0.2, timeout=300.0):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def next_delay(self, attempt, hint=None):
+        if hint is not None:
+            delay = hint
+        else:
+            delay = self.initial * (self.factor ** attempt)
+        delay = min(self.max_interval, delay)
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay)
+
+
+def retry_hint(task_data):
+    """Server-suggested wait in seconds from a task status payload, if any"""
+    if not isinstance(task_data, dict):
+        return None
+    for field in ("retry_after", "poll_after", "eta_seconds"):
+        value = task_data.get(field)
+        if isinstance(value, (int, float)) and value >= 0:
+            return float(value)
+    return None
+
+
+class PollScheduler:
+    """Poll many tasks from a single timer loop
+
+    ``check`` is an async callable taking a task ID and returning
+    (status, task_data, hint_seconds). ``wait`` resolves to the task data
+    once the status is "completed", or None if it failed, errored or ran
+    past the policy timeout.
+    """
+
+    def __init__(self, check, policy=None, max_in_flight=50):
+        self.check = check
+        self.policy = policy or BackoffPolicy()
+        self.max_in_flight = max_in_flight
+        self.stats = {"polls": 0, "completed": 0, "failed": 0, "timed_out": 0}
+        self._heap = []
+        self._tasks = {}
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._runner = None
+        self._in_flight = set()
+        self._semaphore = None
+
+    @property
+    def pending(self):
+        return len(self._tasks)
+
+    def _schedule(self, task_id, due):
+        heapq.heappush(self._heap, (due, next(self._sequence), task_id))
+        self._wakeup.set()
+
+    async def wait(self, task_id):
+        """Start polling task_id and wait for its final task data
+
+        Waiting again for a task that is already being polled shares its
+        result instead of starting a second poll.
+        """
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        entry = self._tasks.get(task_id)
+        if entry is not None:
+            return await asyncio.shield(entry["future"])
+
+        future = loop.create_future()
+        self._tasks[task_id] = {
+            "future": future,
+            "attempt": 0,
+            "deadline": loop.time() + self.policy.timeout,
+        }
+        self._schedule(task_id, loop.time() + self.policy.next_delay(0))
+
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        return await future
+
+    async def wait_many(self, task_ids):
+        """Wait for several tasks, results in the same order as task_ids"""
+        return await asyncio.gather(*(self.wait(task_id) for task_id in task_ids))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._heap or self._in_flight:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due = self._heap[0][0]
+            delay = due - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, task_id = heapq.heappop(self._heap)
+            poll = asyncio.create_task(self._poll(task_id))
+            self._in_flight.add(poll)
+            poll.add_done_callback(self._poll_done)
+
+    def _poll_done(self, poll):
+        self._in_flight.discard(poll)
+        self._wakeup.set()
+
+    def _finish(self, task_id, result, outcome):
+        entry = self._tasks.pop(task_id, None)
+        self.stats[outcome] += 1
+        if entry and not entry["future"].done():
+            entry["future"].set_result(result)
+
+    async def _poll(self, task_id):
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return
+
+        async with self._semaphore:
+            self.stats["polls"] += 1
+            try:
+                status, task_data, hint = await self.check(task_id)
+            except Exception as e:
+                print(f"ERROR: Error checking task {task_id} status: {e}")
+                status, task_data, hint = None, None, None
+
+        if status == "completed":
+            self._finish(task_id, task_data, "completed")
+            return
+        if status is None or status == "failed":
+            self._finish(task_id, None, "failed")
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now >= entry["deadline"]:
+            print(f"TIMEOUT: Task {task_id} did not complete within {self.policy.timeout} seconds")
+            self._finish(task_id, None, "timed_out")
+            return
+
+        # The last poll lands on the deadline rather than skipping past it
+        entry["attempt"] += 1
+        delay = self.policy.next_delay(entry["attempt"], hint)
+        self._schedule(task_id, min(now + delay, entry["deadline"]))
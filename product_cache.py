@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cache of resolved products per shopping-list item and store
+Repeat items open their known product page instead of searching again
+"""
+
+import re
+import time
+
+from sqlite_cache import DEFAULT_CACHE_PATH, SQLiteCache
+
+PRODUCT_CACHE_TTL = 14 * 24 * 60 * 60  # 14 days before a product is searched again
+PRICE_MAX_AGE = 2 * 24 * 60 * 60  # 2 days before a cached price is re-checked
+PRODUCT_CACHE_MAX_ENTRIES = 50000
+DEFAULT_STORE = "instacart"
+
+_QUANTITY_SUFFIX = re.compile(r'\s+-\s+.*$')
+
+
+def normalize_item_name(name):
+    """Canonical form of a shopping-list entry for cache keys"""
+    name = _QUANTITY_SUFFIX.sub('', name)
+    return " ".join(name.casefold().split())
+
+
+class ProductCache:
+    """Last resolved product (GroceryItem fields) per item name and store
+
+    Entries older than ``ttl`` are evicted and searched for again. Within
+    the TTL the product page is reused, but once the stored price is
+    older than ``price_max_age`` the entry is marked ``price_stale`` so
+    the agent re-reads the price on the product page.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=PRODUCT_CACHE_TTL, price_max_age=PRICE_MAX_AGE,
+                 max_entries=PRODUCT_CACHE_MAX_ENTRIES):
+        self.price_max_age = price_max_age
+        self._cache = SQLiteCache(path, table="products", ttl=ttl, max_entries=max_entries)
+
+    @staticmethod
+    def key(name, store=DEFAULT_STORE):
+        return f"{store}:{normalize_item_name(name)}"
+
+    def lookup(self, items, store=DEFAULT_STORE):
+        """Return {item: entry} for the items with a cached product
+
+        Each entry is a dict with the product fields under "product", the
+        time the price was seen under "price_checked_at", and "price_stale".
+        """
+        keys = {item: self.key(item, store) for item in items}
+        found = self._cache.get_many(keys.values())
+        now = time.time()
+
+        hits = {}
+        for item, key in keys.items():
+            entry = found.get(key)
+            if entry is None:
+                continue
+            entry["price_stale"] = now - entry["price_checked_at"] > self.price_max_age
+            hits[item] = entry
+        return hits
+
+    def remember(self, products, store=DEFAULT_STORE):
+        """Store resolved products, keyed on their `query` (else their name)
+
+        `products` are dicts with the GroceryItem fields.
+        """
+        now = time.time()
+        entries = {}
+        for product in products:
+            name = product.get("query") or product.get("name")
+            if not name or not product.get("url"):
+                continue
+            entries[self.key(name, store)] = {"product": product, "price_checked_at": now}
+        self._cache.set_many(entries)
+        return len(entries)
+
+    def forget(self, item, store=DEFAULT_STORE):
+        """Drop a cached product, e.g. after its page turned out to be gone"""
+        self._cache.delete(self.key(item, store))
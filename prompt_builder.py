@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Compact task prompts for the shopping agents
+Renders items one per line, keeps the shared rules in the agent
+instructions only, counts tokens and splits long lists into tasks that
+stay under a token budget
+"""
+
+# The agent sends instructions + task on every step, so both are kept short
+SHOPPING_INSTRUCTIONS = (
+    "You shop on Instacart (https://www.instacart.com/). Log in first if you are not logged in. "
+    "For each item: search for it, open the best match (closest name, lowest price), click \"Add to cart\", "
+    "then clear the search box before the next item. Set \"query\" on each result to the list entry it "
+    "was picked for. Only open the cart or check out when the task says so."
+)
+
+# For agents that share the cart with others and must never check out
+CART_ONLY_INSTRUCTIONS = (
+    "You shop on Instacart (https://www.instacart.com/). Log in first if you are not logged in. "
+    "For each item: search for it, open the best match (closest name, lowest price), click \"Add to cart\", "
+    "then clear the search box before the next item. Set \"query\" on each result to the list entry it "
+    "was picked for. Never open the cart, start checkout or add payment details; other agents share this cart."
+)
+
+CHECKOUT_STEPS = (
+    "Check out: open the cart and review it, click \"Checkout\", choose delivery or pickup, go to payment, "
+    "click \"Add payment method\" and add the test card 4111 1111 1111 1111. "
+    "Do not stop until the card is added."
+)
+
+DEFAULT_TASK_TOKEN_BUDGET = 1500  # task text per agent, instructions included
+# Approximate input price of the agent model in dollars per million tokens;
+# set it to your model's rate to get accurate cost logs
+TOKEN_PRICE_PER_MILLION = 2.0
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Token count of text; tiktoken when installed, else ~4 characters per token"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _known_line(item, entry):
+    note = ' (recheck price)' if entry['price_stale'] else ''
+    return f"- {item}: {entry['product']['url']}{note}"
+
+
+def format_known_products(known: dict) -> str:
+    """Prompt section telling the agent to open cached product pages directly"""
+    if not known:
+        return ''
+    lines = '\n'.join(_known_line(item, entry) for item, entry in known.items())
+    return f"Open these product pages directly instead of searching, then add to cart:\n{lines}\n"
+
+
+def build_add_items_task(items: list[str], known: dict | None = None, checkout: bool = False) -> str:
+    """Task that adds items to the cart, and checks out if asked"""
+    known = {item: known[item] for item in items if item in known} if known else {}
+    search = [item for item in items if item not in known]
+    parts = []
+    if search:
+        parts.append("Add to cart:\n" + '\n'.join(f"- {item}" for item in search) + '\n')
+    parts.append(format_known_products(known))
+    parts.append(CHECKOUT_STEPS if checkout else "Do not open the cart or check out; stop once these items are in the cart.")
+    return ''.join(parts)
+
+
+def build_single_item_task(item: str, known_entry: dict | None = None) -> str:
+    """Task for adding one item, used when streaming results item by item"""
+    if known_entry:
+        find = f"Open {known_entry['product']['url']} (picked for \"{item}\" before)"
+        if known_entry['price_stale']:
+            find += " and read its current price"
+        find += ", then add it to the cart."
+    else:
+        find = f"Add \"{item}\" to the cart."
+    return f"{find} Do not check out. Report the item with \"query\" set to \"{item}\"."
+
+
+def build_checkout_task() -> str:
+    """Task for the final agent that checks out an already filled cart"""
+    return f"The cart is already filled. {CHECKOUT_STEPS}"
+
+
+def chunk_items(items: list[str], known: dict | None = None, budget: int = DEFAULT_TASK_TOKEN_BUDGET,
+                checkout: bool = True) -> list[list[str]]:
+    """Split items into groups whose task (plus instructions) fits the budget
+
+    A single item that does not fit on its own still gets its own group.
+    """
+    known = known or {}
+    base = count_tokens(SHOPPING_INSTRUCTIONS) + count_tokens(build_add_items_task([], checkout=checkout)) + 16
+    chunks = []
+    chunk = []
+    used = base
+    for item in items:
+        line = _known_line(item, known[item]) if item in known else f"- {item}"
+        cost = count_tokens(line) + 1
+        if chunk and used + cost > budget:
+            chunks.append(chunk)
+            chunk = []
+            used = base
+        chunk.append(item)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def build_shopping_tasks(items: list[str], known: dict | None = None, checkout: bool = True,
+                         budget: int = DEFAULT_TASK_TOKEN_BUDGET) -> list[str]:
+    """Tasks covering every item, each under budget; only the last one checks out"""
+    chunks = chunk_items(items, known, budget, checkout)
+    return [
+        build_add_items_task(chunk, known, checkout=checkout and n == len(chunks) - 1)
+        for n, chunk in enumerate(chunks)
+    ]
+
+
+def prompt_cost(tasks: list[str], item_count: int) -> dict:
+    """Tokens and dollars per agent step for a set of tasks, in total and per item"""
+    instructions = count_tokens(SHOPPING_INSTRUCTIONS)
+    tokens = sum(count_tokens(task) + instructions for task in tasks)
+    dollars = tokens * TOKEN_PRICE_PER_MILLION / 1_000_000
+    per_item = max(1, item_count)
+    return {
+        "tasks": len(tasks),
+        "tokens": tokens,
+        "tokens_per_item": tokens / per_item,
+        "dollars": dollars,
+        "dollars_per_item": dollars / per_item,
+    }
+
+
+def log_prompt_cost(tasks: list[str], item_count: int) -> dict:
+    """Print prompt_cost for a run and return it"""
+    cost = prompt_cost(tasks, item_count)
+    print(
+        f"🧾 Prompt: {cost['tasks']} task(s), {cost['tokens']} tokens per step "
+        f"({cost['tokens_per_item']:.0f}/item, ${cost['dollars_per_item']:.5f}/item, ${cost['dollars']:.4f} total)"
+    )
+    return cost
@@ -50,6 +50,7 @@ setup(
             "ai-shopping=google_docs_shopping_final:main",
             "browser-shop=browser_shop:main",
             "manus-fetch=manus_final_system:main",
+            "shopping-scheduler=shopping_scheduler:main",
         ],
     },
     keywords="ai automation shopping browser translation deepl notion google-docs",
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Long-running scheduler for shopping runs from many tenants
+Jobs are served round-robin between tenants, by priority within a
+tenant. Fetch/translate/parse runs on a wide async worker pool, browser
+automation on a small pool capped by free RAM, with each tenant's
+account shopped in its own browser profile, one run at a time. Queue
+depth and throughput are served over HTTP
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import re
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import web
+
+import instrumentation
+from async_http import close_http_client
+from browser_pool import DEFAULT_PROFILE_DIR, BrowserPool
+from browser_shop import add_to_cart, default_worker_count
+from ingest_pipeline import IngestPipeline, ListJob, manifest_entry
+
+DEFAULT_PORT = 8088
+DEFAULT_INGEST_WORKERS = 16
+THROUGHPUT_WINDOW = 60.0  # seconds of finished jobs behind the throughput figures
+MAX_FINISHED_JOBS = 10000  # finished jobs kept for status lookups
+
+QUEUED = "queued"
+INGESTING = "ingesting"
+WAITING_BROWSER = "waiting_browser"
+SHOPPING = "shopping"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass(slots=True)
+class ShoppingJob:
+    """One tenant's request to ingest a list and, optionally, shop it"""
+
+    tenant: str
+    list_job: ListJob
+    priority: int = 0  # higher runs first, among the same tenant's jobs
+    shop: bool = True
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    items: int = 0
+    cart_items: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "tenant": self.tenant,
+            "list_id": self.list_job.list_id,
+            "source": self.list_job.source,
+            "priority": self.priority,
+            "shop": self.shop,
+            "state": self.state,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "items": self.items,
+            "cart_items": self.cart_items,
+            "error": self.error,
+        }
+
+
+class FairQueue:
+    """Async queue with round-robin fairness across tenants
+
+    The next job comes from the tenant served longest ago that has jobs
+    waiting; priority only orders jobs within one tenant's queue, so no
+    tenant can jump ahead of the others by raising its priorities.
+    Paused tenants are skipped until resumed.
+    """
+
+    def __init__(self):
+        self._tenants = {}  # tenant -> heap of (-priority, seq, job)
+        self._last_served = {}
+        self._paused = set()
+        self._seq = itertools.count()
+        self._turn = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def depth_by_tenant(self):
+        return {tenant: len(heap) for tenant, heap in self._tenants.items()}
+
+    def put(self, job):
+        heapq.heappush(self._tenants.setdefault(job.tenant, []), (-job.priority, next(self._seq), job))
+        self._size += 1
+        self._wakeup.set()
+
+    def pause(self, tenant):
+        """Hold back a tenant's jobs, e.g. while its account is busy"""
+        self._paused.add(tenant)
+
+    def resume(self, tenant):
+        self._paused.discard(tenant)
+        self._wakeup.set()
+
+    def _pop(self):
+        ready = [tenant for tenant in self._tenants if tenant not in self._paused]
+        if not ready:
+            return None
+        tenant = min(ready, key=lambda name: self._last_served.get(name, -1))
+        heap = self._tenants[tenant]
+        _, _, job = heapq.heappop(heap)
+        if not heap:
+            del self._tenants[tenant]
+        self._last_served[tenant] = next(self._turn)
+        self._size -= 1
+        return job
+
+    async def get(self):
+        while True:
+            job = self._pop()
+            if job is not None:
+                return job
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+
+class ShoppingScheduler:
+    """Runs ShoppingJobs through an ingest pool and a RAM-capped browser pool
+
+    ``ingest_workers`` coroutines fetch, translate, parse and store lists
+    (mostly waiting on HTTP, so they are cheap). ``browser_workers``
+    (default: sized from free memory and CPUs like the parallel shopper)
+    shop lists in browsers leased from per-tenant BrowserPools.
+
+    A tenant is one Instacart account: its pool has a single browser
+    with its own profile under ``profile_dir``, and the tenant is paused
+    in the browser queue while one of its runs is shopping, so no run
+    checks out a cart another run is filling. At most ``browser_workers``
+    tenant pools stay open; the least recently used idle one is closed
+    to make room.
+    """
+
+    def __init__(self, ingest_workers=DEFAULT_INGEST_WORKERS, browser_workers=None, pipeline=None,
+                 profile_dir=DEFAULT_PROFILE_DIR):
+        self.ingest_workers = ingest_workers
+        self.browser_workers = browser_workers or default_worker_count()
+        self.pipeline = pipeline or IngestPipeline(report_interval=0)
+        self.profile_dir = profile_dir
+        self.browser_pools = OrderedDict()  # tenant -> BrowserPool, least recently used first
+        self._shopping = set()
+        self.ingest_queue = FairQueue()
+        self.browser_queue = FairQueue()
+        self.jobs = {}
+        self._finished = deque()
+        self._recent = deque()  # (finished_at, items) inside THROUGHPUT_WINDOW
+        self.counts = {"submitted": 0, DONE: 0, FAILED: 0, "items": 0}
+        self.active = {INGESTING: 0, SHOPPING: 0}
+        self.started_at = None
+        self._tasks = []
+
+    def submit(self, tenant, entry, priority=0, shop=True):
+        """Queue a list for a tenant, returns the ShoppingJob
+
+        entry is a manifest entry: a Docs URL, "notion:<id>", or a dict
+        with "docs_url" or "notion_database_id" and an optional "list_id".
+        List IDs are prefixed with the tenant so tenants never share a list.
+        """
+        list_job = manifest_entry(entry)
+        list_job.list_id = f"{tenant}/{list_job.list_id}"
+        job = ShoppingJob(tenant, list_job, priority, shop)
+        self.jobs[job.job_id] = job
+        self.counts["submitted"] += 1
+        self.ingest_queue.put(job)
+        return job
+
+    def _finish(self, job, error=None):
+        job.error = error
+        job.state = FAILED if error else DONE
+        job.finished_at = time.time()
+        self.counts[job.state] += 1
+        self.counts["items"] += job.items
+        self._recent.append((job.finished_at, job.items))
+        self._finished.append(job.job_id)
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    async def _ingest_worker(self):
+        while True:
+            job = await self.ingest_queue.get()
+            job.state = INGESTING
+            job.started_at = time.time()
+            self.active[INGESTING] += 1
+            try:
+                with instrumentation.span("scheduler_ingest", tenant=job.tenant):
+                    await self.pipeline.ingest(job.list_job)
+            finally:
+                self.active[INGESTING] -= 1
+
+            if job.list_job.error:
+                self._finish(job, job.list_job.error)
+                continue
+            job.items = len(job.list_job.items or ())
+            if job.shop and job.items:
+                job.state = WAITING_BROWSER
+                self.browser_queue.put(job)
+            else:
+                self._finish(job)
+
+    def tenant_profile_dir(self, tenant):
+        """Browser profile root of one tenant, safe as a path whatever the tenant name"""
+        safe = re.sub(r'[^\w-]+', '_', tenant)[:40]
+        digest = hashlib.sha256(tenant.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.profile_dir, f"{safe}-{digest}")
+
+    async def _tenant_pool(self, tenant):
+        """The tenant's BrowserPool, closing idle pools beyond browser_workers"""
+        pool = self.browser_pools.get(tenant)
+        if pool is None:
+            # Browsers start lazily on the first lease
+            pool = self.browser_pools[tenant] = BrowserPool(size=1, profile_dir=self.tenant_profile_dir(tenant))
+        self.browser_pools.move_to_end(tenant)
+        idle = [name for name in self.browser_pools if name not in self._shopping and name != tenant]
+        for name in idle[:max(0, len(self.browser_pools) - self.browser_workers)]:
+            await self.browser_pools.pop(name).close()
+        return pool
+
+    async def _browser_worker(self):
+        while True:
+            job = await self.browser_queue.get()
+            # One run per account at a time, its other jobs wait in the queue
+            self.browser_queue.pause(job.tenant)
+            self._shopping.add(job.tenant)
+            job.state = SHOPPING
+            self.active[SHOPPING] += 1
+            try:
+                pool = await self._tenant_pool(job.tenant)
+                with instrumentation.span("scheduler_shop", tenant=job.tenant):
+                    result = await add_to_cart(list(job.list_job.items), workers=1, pool=pool)
+            except Exception as e:
+                self._finish(job, f"shop: {e}")
+                continue
+            finally:
+                self.active[SHOPPING] -= 1
+                self._shopping.discard(job.tenant)
+                self.browser_queue.resume(job.tenant)
+
+            cart = result.structured_output
+            job.cart_items = len(cart.items) if cart else 0
+            self._finish(job, '; '.join(result.errors) or (None if cart else "shop: no items added"))
+
+    async def start(self):
+        self.started_at = time.time()
+        self._tasks = [asyncio.create_task(self._ingest_worker()) for _ in range(max(1, self.ingest_workers))]
+        self._tasks += [asyncio.create_task(self._browser_worker()) for _ in range(max(1, self.browser_workers))]
+        print(f"🗓️  Scheduler started: {self.ingest_workers} ingest workers, {self.browser_workers} browser workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.pipeline.close()
+        pools, self.browser_pools = list(self.browser_pools.values()), OrderedDict()
+        await asyncio.gather(*(pool.close() for pool in pools), return_exceptions=True)
+
+    def stats(self):
+        """Queue depths, active jobs and throughput"""
+        now = time.time()
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW:
+            self._recent.popleft()
+        window = min(THROUGHPUT_WINDOW, now - self.started_at) if self.started_at else 0.0
+        recent_items = sum(items for _, items in self._recent)
+        uptime = now - self.started_at if self.started_at else 0.0
+        return {
+            "uptime_seconds": round(uptime, 3),
+            "workers": {"ingest": self.ingest_workers, "browser": self.browser_workers},
+            "queue_depth": {
+                "ingest": len(self.ingest_queue),
+                "browser": len(self.browser_queue),
+            },
+            "queue_depth_by_tenant": {
+                "ingest": self.ingest_queue.depth_by_tenant(),
+                "browser": self.browser_queue.depth_by_tenant(),
+            },
+            "active": dict(self.active),
+            "jobs": dict(self.counts),
+            "throughput": {
+                "jobs_per_minute": len(self._recent) * 60 / window if window else 0.0,
+                "items_per_second": recent_items / window if window else 0.0,
+                "total_jobs_per_minute": (self.counts[DONE] + self.counts[FAILED]) * 60 / uptime if uptime else 0.0,
+            },
+            "browser_pools": {tenant: dict(pool.stats) for tenant, pool in self.browser_pools.items()},
+        }
+
+    def prometheus_text(self):
+        """stats() as Prometheus gauges, followed by the instrumentation metrics"""
+        stats = self.stats()
+        lines = ["# TYPE shopping_scheduler_queue_depth gauge"]
+        lines += [f'shopping_scheduler_queue_depth{{queue="{queue}"}} {depth}'
+                  for queue, depth in stats["queue_depth"].items()]
+        lines.append("# TYPE shopping_scheduler_active_jobs gauge")
+        lines += [f'shopping_scheduler_active_jobs{{state="{state}"}} {count}'
+                  for state, count in stats["active"].items()]
+        lines.append("# TYPE shopping_scheduler_jobs_total counter")
+        lines += [f'shopping_scheduler_jobs_total{{state="{state}"}} {self.counts[state]}'
+                  for state in ("submitted", DONE, FAILED)]
+        lines.append("# TYPE shopping_scheduler_items_total counter")
+        lines.append(f"shopping_scheduler_items_total {self.counts['items']}")
+        lines.append("# TYPE shopping_scheduler_items_per_second gauge")
+        lines.append(f"shopping_scheduler_items_per_second {stats['throughput']['items_per_second']:.3f}")
+        return '\n'.join(lines) + '\n' + instrumentation.prometheus_text()
+
+
+def create_scheduler_app(scheduler):
+    """aiohttp app exposing a ShoppingScheduler
+
+    POST /jobs       {"tenant", "docs_url" | "notion_database_id", "list_id"?, "priority"?, "shop"?}
+    GET  /jobs/{id}  job status
+    GET  /stats      queue depth, active jobs and throughput as JSON
+    GET  /metrics    the same in Prometheus text format
+    """
+    app = web.Application()
+    app['scheduler'] = scheduler
+
+    async def submit(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "body must be JSON"}, status=400)
+        tenant = str(body.get("tenant") or "").strip()
+        if not tenant:
+            return web.json_response({"error": "tenant is required"}, status=400)
+        entry = {key: body[key] for key in ("docs_url", "notion_database_id", "list_id") if body.get(key)}
+        try:
+            job = scheduler.submit(tenant, entry, int(body.get("priority", 0)), bool(body.get("shop", True)))
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(job.to_dict(), status=202)
+
+    async def job_status(request):
+        job = scheduler.jobs.get(request.match_info['job_id'])
+        if job is None:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response(job.to_dict())
+
+    async def stats(request):
+        return web.json_response(scheduler.stats())
+
+    async def metrics(request):
+        return web.Response(text=scheduler.prometheus_text(), content_type='text/plain')
+
+    async def on_startup(app):
+        await scheduler.start()
+
+    async def on_cleanup(app):
+        await scheduler.stop()
+        await close_http_client()
+
+    app.router.add_post('/jobs', submit)
+    app.router.add_get('/jobs/{job_id}', job_status)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/metrics', metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    """python shopping_scheduler.py [port] [ingest=N] [browsers=N]"""
+    port = DEFAULT_PORT
+    options = {"ingest": DEFAULT_INGEST_WORKERS, "browsers": None}
+    for arg in sys.argv[1:]:
+        key, _, value = arg.partition('=')
+        if arg.isdigit():
+            port = int(arg)
+        elif key in options and value.isdigit():
+            options[key] = int(value)
+        else:
+            print(f"Unknown option: {arg}")
+            print(main.__doc__)
+            return
+
+    scheduler = ShoppingScheduler(ingest_workers=options["ingest"], browser_workers=options["browsers"])
+    print(f"Serving shopping scheduler on http://127.0.0.1:{port}")
+    web.run_app(create_scheduler_app(scheduler), host='127.0.0.1', port=port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Disk-backed key/value cache on top of SQLite
+Entries expire after a TTL and the least recently used ones are evicted
+once the table grows past its size limit
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default location for all local caches
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-shopping", "cache.db")
+
+
+def connect_sqlite(path):
+    """Open a SQLite connection tuned for concurrent local use"""
+    if path != ":memory:":
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteCache:
+    """Key/value cache stored in one SQLite table
+
+    Values are stored as JSON. ``ttl`` is in seconds (None never expires) and
+    ``max_entries`` caps the table size (None means unbounded).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, table="cache", ttl=None, max_entries=None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+        self._conn.commit()
+
+    def _is_expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return a dict of the keys that have a live cache entry"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        expired = []
+
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            if expired:
+                self._conn.executemany(
+                    f"DELETE FROM {self.table} WHERE key = ?",
+                    [(key,) for key in expired],
+                )
+            self._conn.commit()
+
+        return found
+
+    def set(self, key, value):
+        """Store a single value"""
+        self.set_many({key: value})
+
+    def set_many(self, mapping):
+        """Store several values in one transaction"""
+        if not mapping:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in mapping.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        """Remove a key from the cache"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Delete every expired entry and return how many were removed"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?",
+                (time.time() - self.ttl,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries (lock held)"""
+        if self.max_entries is None:
+            return
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Local stub servers for the external APIs
+Lets the async clients be exercised without live services or API keys;
+every stub takes a latency and an error rate to emulate slow or flaky
+upstreams
+"""
+
+import asyncio
+import hashlib
+import itertools
+import random
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+# Large enough for a 100k item list in one request; aiohttp's default is 1 MB
+STUB_MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# Small word list so stub translations look plausible
+STUB_DICTIONARY = {
+    'leche': 'milk', 'huevos': 'eggs', 'pan': 'bread', 'manzanas': 'apples',
+    'pollo': 'chicken', 'arroz': 'rice', 'queso': 'cheese', 'litros': 'liters',
+    'docena': 'dozen', 'barras': 'loaves', 'paquete': 'package', 'gramos': 'grams',
+    'lista': 'list', 'de': 'of', 'compras': 'shopping', 'supermercado': 'supermarket',
+}
+
+
+# Entries for synthetic documents: (Spanish name, quantity)
+SYNTHETIC_ENTRIES = [
+    ('Leche', '2 litros'), ('Huevos', '1 docena'), ('Pan', '2 barras'), ('Manzanas', '1 kilo'),
+    ('Pollo', '1 kilo'), ('Arroz', '1 paquete'), ('Queso', '200 gramos'), ('Milk', '1 gallon'),
+]
+
+
+def add_faults(app, latency=0.0, error_rate=0.0, jitter=0.0, seed=None):
+    """Delay every request by latency (+/- jitter) seconds and fail error_rate of them with a 503"""
+    rng = random.Random(seed)
+    app.setdefault('stats', {})['injected_errors'] = 0
+
+    @web.middleware
+    async def faults(request, handler):
+        delay = latency + (rng.uniform(-jitter, jitter) if jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            app['stats']['injected_errors'] += 1
+            return web.json_response({'error': 'injected failure'}, status=503)
+        return await handler(request)
+
+    app.middlewares.append(faults)
+    return app
+
+
+def synthetic_grocery_document(count, seed=42):
+    """Numbered, mostly Spanish shopping list with count entries"""
+    rng = random.Random(seed)
+    lines = ["Lista de Compras - Supermercado", ""]
+    for n in range(1, count + 1):
+        name, quantity = rng.choice(SYNTHETIC_ENTRIES)
+        lines.append(f"{n}. {name} {n % 500} - {quantity}")
+    return "\n".join(lines)
+
+
+def stub_translate(text):
+    """Word-by-word dictionary translation used by the DeepL stub"""
+    return " ".join(STUB_DICTIONARY.get(word.lower(), word) for word in text.split(" "))
+
+
+def create_deepl_app(latency=0.0, error_rate=0.0):
+    """aiohttp app mimicking DeepL's POST /v2/translate"""
+    app = web.Application(client_max_size=STUB_MAX_REQUEST_SIZE)
+    app['stats'] = {'requests': 0, 'texts': 0}
+    add_faults(app, latency, error_rate)
+
+    async def translate(request):
+        form = await request.post()
+        texts = form.getall('text', [])
+        app['stats']['requests'] += 1
+        app['stats']['texts'] += len(texts)
+        return web.json_response({
+            'translations': [
+                {'detected_source_language': form.get('source_lang', 'ES'), 'text': stub_translate(text)}
+                for text in texts
+            ]
+        })
+
+    app.router.add_post('/v2/translate', translate)
+    return app
+
+
+def sample_notion_results(count=7):
+    """Notion database query response with count grocery rows"""
+    names = ['Milk', 'Eggs', 'Bread', 'Apples', 'Chicken', 'Rice', 'Cheese']
+    quantities = ['2 liters', '1 dozen', '2 loaves', '1 kilo', '1 kilo', '1 package', '200 grams']
+    results = []
+    for i in range(count):
+        results.append({
+            'object': 'page',
+            'properties': {
+                'Item': {'title': [{'text': {'content': names[i % len(names)]}}]},
+                'Quantity': {'rich_text': [{'text': {'content': quantities[i % len(quantities)]}}]},
+            },
+        })
+    return {'object': 'list', 'results': results, 'has_more': False, 'next_cursor': None}
+
+
+def create_manus_app(complete_after=0.5, items_per_task=7, latency=0.0, error_rate=0.0):
+    """aiohttp app mimicking the Manus /tasks endpoints
+
+    Tasks report "running" until complete_after seconds have passed since
+    they were created, then "completed". Tasks created with a callback_url
+    get a completion event posted to it at that point.
+    """
+    app = web.Application(client_max_size=STUB_MAX_REQUEST_SIZE)
+    app['tasks'] = {}
+    app['stats'] = {'created': 0, 'status_checks': 0, 'results': 0, 'callbacks': 0}
+    add_faults(app, latency, error_rate)
+    ids = itertools.count(1)
+    background = set()
+
+    async def send_callback(task_id, callback_url):
+        await asyncio.sleep(complete_after)
+        async with aiohttp.ClientSession() as session:
+            async with session.post(callback_url, json={'task_id': task_id, 'status': 'completed'}) as response:
+                await response.read()
+        app['stats']['callbacks'] += 1
+
+    async def create_task(request):
+        payload = await request.json()
+        task_id = f"task-{next(ids)}"
+        app['tasks'][task_id] = {'created': time.monotonic(), 'payload': payload}
+        app['stats']['created'] += 1
+        if payload.get('callback_url'):
+            callback = asyncio.create_task(send_callback(task_id, payload['callback_url']))
+            background.add(callback)
+            callback.add_done_callback(background.discard)
+        return web.json_response({'id': task_id, 'status': 'pending'}, status=201)
+
+    def task_status(task):
+        return 'completed' if time.monotonic() - task['created'] >= complete_after else 'running'
+
+    async def get_task(request):
+        task = app['tasks'].get(request.match_info['task_id'])
+        if task is None:
+            return web.json_response({'error': 'not found'}, status=404)
+        app['stats']['status_checks'] += 1
+        return web.json_response({'id': request.match_info['task_id'], 'status': task_status(task)})
+
+    async def get_result(request):
+        task = app['tasks'].get(request.match_info['task_id'])
+        if task is None or task_status(task) != 'completed':
+            return web.json_response({'error': 'not ready'}, status=404)
+        app['stats']['results'] += 1
+        return web.json_response(sample_notion_results(items_per_task))
+
+    app.router.add_post('/tasks', create_task)
+    app.router.add_get('/tasks/{task_id}', get_task)
+    app.router.add_get('/tasks/{task_id}/result', get_result)
+    return app
+
+
+def create_dedalus_app(latency=0.0, error_rate=0.0):
+    """aiohttp app mimicking Dedalus' GET /models and POST /chat/completions"""
+    app = web.Application(client_max_size=STUB_MAX_REQUEST_SIZE)
+    app['stats'] = {'models': 0, 'completions': 0}
+    add_faults(app, latency, error_rate)
+
+    async def models(request):
+        app['stats']['models'] += 1
+        return web.json_response({'object': 'list', 'data': [{'id': 'gpt-4', 'object': 'model'}]})
+
+    async def chat_completions(request):
+        payload = await request.json()
+        app['stats']['completions'] += 1
+        prompt = ' '.join(message.get('content', '') for message in payload.get('messages', ()))
+        plan = {
+            'search_strategy': 'Search each item by its plain name',
+            'price_tips': 'Prefer store brands',
+            'cart_management': 'Clear the search box between items',
+            'checkout_flow': 'Review the cart once before paying',
+        }
+        prompt_tokens = len(prompt) // 4
+        return web.json_response({
+            'id': f"chatcmpl-{app['stats']['completions']}",
+            'object': 'chat.completion',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': str(plan)}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 60, 'total_tokens': prompt_tokens + 60},
+        })
+
+    app.router.add_get('/models', models)
+    app.router.add_post('/chat/completions', chat_completions)
+    return app
+
+
+def create_docs_app(latency=0.0, error_rate=0.0):
+    """aiohttp app mimicking the Google Docs plain-text export
+
+    GET /document/d/<doc_id>/export serves a fixed document per ID, with
+    an ETag so conditional requests get a 304; an ID of "items-<N>" serves
+    synthetic_grocery_document(N).
+    """
+    app = web.Application(client_max_size=STUB_MAX_REQUEST_SIZE)
+    app['documents'] = {}
+    app['stats'] = {'exports': 0, 'not_modified': 0}
+    add_faults(app, latency, error_rate)
+
+    def document(doc_id):
+        text = app['documents'].get(doc_id)
+        if text is None:
+            prefix, _, count = doc_id.partition('-')
+            if prefix != 'items' or not count.isdigit():
+                return None
+            text = app['documents'][doc_id] = synthetic_grocery_document(int(count))
+        return text
+
+    async def export(request):
+        text = document(request.match_info['doc_id'])
+        if text is None:
+            return web.Response(status=404, text='Document not found')
+        etag = '"' + hashlib.sha256(text.encode('utf-8')).hexdigest()[:32] + '"'
+        if request.headers.get('If-None-Match') == etag:
+            app['stats']['not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        app['stats']['exports'] += 1
+        return web.Response(text=text, content_type='text/plain', headers={'ETag': etag})
+
+    app.router.add_get('/document/d/{doc_id}/export', export)
+    return app
+
+
+async def start_stub_server(app, host='127.0.0.1', port=0):
+    """Start an app on a local port and return (runner, base_url)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+STUB_APPS = {
+    'deepl': create_deepl_app,
+    'manus': create_manus_app,
+    'dedalus': create_dedalus_app,
+    'docs': create_docs_app,
+}
+
+
+def main():
+    """Run one stub server in the foreground: python stub_servers.py <deepl|manus|dedalus|docs> [port]"""
+    name = sys.argv[1] if len(sys.argv) > 1 else 'deepl'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+
+    if name not in STUB_APPS:
+        print(f"Unknown stub: {name}. Choose from: {', '.join(STUB_APPS)}")
+        return
+
+    print(f"Serving {name} stub on http://127.0.0.1:{port}")
+    web.run_app(STUB_APPS[name](), host='127.0.0.1', port=port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_servers import start_stub_server  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_workdir(tmp_path, monkeypatch):
+    """Run each test in its own directory and HOME, so disk caches start empty"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@asynccontextmanager
+async def serve(app):
+    """Serve a stub app on a free local port for the duration of the block"""
+    runner, base_url = await start_stub_server(app)
+    try:
+        yield base_url
+    finally:
+        await runner.cleanup()
+
+
+def fail_first(app, statuses):
+    """Answer the first requests with the given statuses, then pass through"""
+    pending = list(statuses)
+
+    @web.middleware
+    async def middleware(request, handler):
+        if pending:
+            return web.json_response({"error": "busy"}, status=pending.pop(0), headers={"Retry-After": "0"})
+        return await handler(request)
+
+    app.middlewares.append(middleware)
+    return app
@@ -0,0 +1,37 @@
+from cart_checkpoint import CartCheckpoint, checkpoint_path_for
+
+
+def test_record_and_load(tmp_path):
+    checkpoint = CartCheckpoint(str(tmp_path / "progress" / "list.jsonl"))
+    checkpoint.record("Milk", {"name": "Whole Milk", "price": 3.49})
+    checkpoint.record("Eggs", {"name": "Large Eggs", "price": 4.99})
+    done = checkpoint.load()
+    assert done["milk"] == {"name": "Whole Milk", "price": 3.49}
+    assert len(done) == 2
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    path = tmp_path / "list.jsonl"
+    checkpoint = CartCheckpoint(str(path))
+    checkpoint.record("Milk", {"name": "Whole Milk"})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"item": "Eggs", "prod')  # crash mid-write
+
+    assert list(checkpoint.load()) == ["milk"]
+    assert path.read_text(encoding="utf-8").endswith("}\n")
+
+    checkpoint.record("Bread", {"name": "Sourdough"})
+    assert sorted(checkpoint.load()) == ["bread", "milk"]
+
+
+def test_clear_removes_the_file(tmp_path):
+    checkpoint = CartCheckpoint(str(tmp_path / "list.jsonl"))
+    checkpoint.record("Milk", {})
+    checkpoint.clear()
+    assert checkpoint.load() == {}
+    checkpoint.clear()
+
+
+def test_path_ignores_order_and_case():
+    assert checkpoint_path_for(["Milk", "eggs"]) == checkpoint_path_for(["Eggs ", "milk"])
+    assert checkpoint_path_for(["Milk"]) != checkpoint_path_for(["Milk", "Eggs"])
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from shopping_scheduler import FairQueue
+
+
+def job(tenant, name, priority=0):
+    return SimpleNamespace(tenant=tenant, name=name, priority=priority)
+
+
+def drain(queue):
+    async def run():
+        return [(await queue.get()).name for _ in range(len(queue))]
+
+    return asyncio.run(run())
+
+
+def test_round_robin_across_tenants():
+    queue = FairQueue()
+    for n in range(3):
+        queue.put(job("a", f"a{n}"))
+    queue.put(job("b", "b0"))
+    queue.put(job("c", "c0"))
+    assert drain(queue) == ["a0", "b0", "c0", "a1", "a2"]
+
+
+def test_priority_orders_only_within_a_tenant():
+    queue = FairQueue()
+    queue.put(job("a", "a-low"))
+    queue.put(job("a", "a-high", priority=10))
+    queue.put(job("b", "b0"))
+    queue.put(job("b", "b1", priority=100))
+    assert drain(queue) == ["a-high", "b1", "a-low", "b0"]
+
+
+def test_paused_tenant_waits_for_resume():
+    async def run():
+        queue = FairQueue()
+        queue.pause("a")
+        queue.put(job("a", "a0"))
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        queue.resume("a")
+        return (await asyncio.wait_for(getter, 1)).name, len(queue)
+
+    assert asyncio.run(run()) == ("a0", 0)
@@ -0,0 +1,56 @@
+import asyncio
+
+from async_http import AsyncHTTPClient
+from conftest import fail_first, serve
+from manus_client import AsyncManusClient
+from manus_final_system import build_notion_task_payload
+from manus_webhook import CompletionListener
+from poll_scheduler import BackoffPolicy
+from stub_servers import create_manus_app, sample_notion_results
+
+FAST_POLLS = BackoffPolicy(initial=0.01, max_interval=0.05, jitter=0, timeout=5)
+PAYLOADS = [build_notion_task_payload(database_id=f"db-{n}") for n in range(3)]
+
+
+def run_many(app, listener=False):
+    async def run():
+        async with serve(app) as base_url, AsyncHTTPClient() as http:
+            if not listener:
+                client = AsyncManusClient(base_url=base_url, client=http, policy=FAST_POLLS)
+                return await client.run_many(PAYLOADS)
+            async with CompletionListener() as events:
+                client = AsyncManusClient(base_url=base_url, client=http, policy=FAST_POLLS,
+                                          listener=events, callback_deadline=5)
+                results = await client.run_many(PAYLOADS)
+                return results, events.stats
+
+    return asyncio.run(run())
+
+
+def test_run_many_polls_every_task():
+    app = create_manus_app(complete_after=0.05, items_per_task=3)
+    results = run_many(app)
+    assert results == [sample_notion_results(3)] * 3
+    assert app["stats"]["created"] == 3
+    assert app["stats"]["status_checks"] >= 3
+    assert app["stats"]["callbacks"] == 0
+
+
+def test_run_many_waits_for_callbacks_instead_of_polling():
+    app = create_manus_app(complete_after=0.05, items_per_task=3)
+    results, events = run_many(app, listener=True)
+    assert results == [sample_notion_results(3)] * 3
+    assert app["stats"]["callbacks"] == 3
+    assert app["stats"]["status_checks"] == 0
+    assert events == {"events": 3, "rejected": 0}
+
+
+def test_create_task_is_not_retried():
+    app = fail_first(create_manus_app(), [503])
+
+    async def run():
+        async with serve(app) as base_url, AsyncHTTPClient(backoff_base=0.01) as http:
+            return await AsyncManusClient(base_url=base_url, client=http).create_task()
+
+    assert asyncio.run(run()) is None
+    assert app["stats"]["created"] == 0
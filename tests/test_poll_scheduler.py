@@ -0,0 +1,51 @@
+import asyncio
+
+from poll_scheduler import BackoffPolicy, PollScheduler
+
+FAST_POLLS = BackoffPolicy(initial=0.01, max_interval=0.02, jitter=0, timeout=1)
+
+
+class FakeTasks:
+    """check() for PollScheduler: each task completes after `polls` checks"""
+
+    def __init__(self, polls=2, final="completed"):
+        self.polls = polls
+        self.final = final
+        self.checks = {}
+
+    async def check(self, task_id):
+        self.checks[task_id] = self.checks.get(task_id, 0) + 1
+        if self.checks[task_id] < self.polls:
+            return "running", {"id": task_id, "status": "running"}, None
+        return self.final, {"id": task_id, "status": self.final}, None
+
+
+def test_wait_many_returns_results_in_order():
+    tasks = FakeTasks(polls=3)
+    scheduler = PollScheduler(tasks.check, FAST_POLLS)
+    results = asyncio.run(scheduler.wait_many(["t1", "t2", "t3"]))
+    assert [result["id"] for result in results] == ["t1", "t2", "t3"]
+    assert tasks.checks == {"t1": 3, "t2": 3, "t3": 3}
+    assert scheduler.stats["completed"] == 3
+    assert scheduler.pending == 0
+
+
+def test_duplicate_wait_shares_one_poll():
+    tasks = FakeTasks(polls=2)
+    scheduler = PollScheduler(tasks.check, FAST_POLLS)
+    first, second = asyncio.run(scheduler.wait_many(["t1", "t1"]))
+    assert first == second == {"id": "t1", "status": "completed"}
+    assert tasks.checks == {"t1": 2}
+
+
+def test_failed_task_resolves_to_none():
+    scheduler = PollScheduler(FakeTasks(final="failed").check, FAST_POLLS)
+    assert asyncio.run(scheduler.wait("t1")) is None
+    assert scheduler.stats["failed"] == 1
+
+
+def test_task_that_never_finishes_times_out():
+    policy = BackoffPolicy(initial=0.01, max_interval=0.02, jitter=0, timeout=0.1)
+    scheduler = PollScheduler(FakeTasks(polls=10 ** 6).check, policy)
+    assert asyncio.run(scheduler.wait("t1")) is None
+    assert scheduler.stats["timed_out"] == 1
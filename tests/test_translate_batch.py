@@ -0,0 +1,50 @@
+import asyncio
+
+from async_http import AsyncHTTPClient
+from conftest import fail_first, serve
+from stub_servers import create_deepl_app
+from translate_grocery_list import translate_lists_batch
+
+LISTS = [
+    "Lista de compras\n1. Leche - 2 litros\n2. Pan - 2 barras",
+    "1. Leche - 2 litros\n2. Queso - 200 gramos\n3. Milk",
+]
+
+
+def translate(app, lists=LISTS):
+    async def run():
+        async with serve(app) as base_url, AsyncHTTPClient(backoff_base=0.01) as client:
+            return await translate_lists_batch(lists, client=client, api_url=f"{base_url}/v2/translate", use_cache=False)
+
+    return asyncio.run(run())
+
+
+def test_keeps_list_and_line_order():
+    result = translate(create_deepl_app())
+    assert result["translations"] == [
+        "list of shopping\n1. milk - 2 liters\n2. bread - 2 loaves",
+        "1. milk - 2 liters\n2. cheese - 200 grams\n3. Milk",
+    ]
+
+
+def test_sends_each_unique_line_once():
+    app = create_deepl_app()
+    result = translate(app)
+    # "Leche - 2 litros" is in both lists; the English line is not sent
+    assert result["stats"]["unique_lines"] == 4
+    assert app["stats"] == {"requests": 1, "texts": 4, "injected_errors": 0}
+
+
+def test_retries_rate_limits_and_unavailable():
+    app = fail_first(create_deepl_app(), [429, 503])
+    result = translate(app)
+    assert result["stats"]["failed_batches"] == 0
+    assert result["batches"][0]["attempts"] == 3
+    assert result["translations"][1].startswith("1. milk - 2 liters")
+
+
+def test_failed_batch_keeps_source_lines():
+    app = fail_first(create_deepl_app(), [503] * 4)
+    result = translate(app)
+    assert result["stats"]["failed_batches"] == 1
+    assert result["translations"] == LISTS
@@ -3,29 +3,72 @@
 Translation utilities for grocery lists
 """
 
+import asyncio
+import hashlib
 import requests
 import re
 import os
+import time
+import unicodedata
+
+import instrumentation
+from async_http import get_http_client
+from grocery_parser import iter_grocery_lines, split_list_marker
+from language_detect import detect_language, detect_line_language, has_words, needs_translation
+from list_store import DEFAULT_LIST_ID, get_list_store
+from sqlite_cache import DEFAULT_CACHE_PATH, SQLiteCache
 
 # DeepL API configuration
 DEEPL_API_KEY = "YOUR_DEEPL_API_KEY_HERE"
 DEEPL_API_URL = "https://api-free.deepl.com/v2/translate"
+DEEPL_MAX_TEXTS_PER_REQUEST = 50
+DEEPL_MAX_REQUEST_BYTES = 128 * 1024
+DEEPL_TIMEOUT = 30
+DEEPL_BATCH_CONCURRENCY = 8
+DOCS_TIMEOUT = 30
+
+# Demo list used when a document has no list entries
+DEFAULT_GROCERY_ITEMS = ('milk', 'eggs', 'bread')
+
+# Reused across calls so repeated requests share a keep-alive connection
+_deepl_session = instrumentation.instrument_session(requests.Session())
+_docs_session = instrumentation.instrument_session(requests.Session())
+
+# Translation cache configuration
+TRANSLATION_CACHE_PATH = DEFAULT_CACHE_PATH
+TRANSLATION_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days
+TRANSLATION_CACHE_MAX_ENTRIES = 100000
+DOCUMENT_CACHE_MAX_ENTRIES = 10000
+
+_translation_cache = None
+_document_cache = None
+
+def get_translation_cache():
+    """Return the shared on-disk translation cache"""
+    global _translation_cache
+    if _translation_cache is None:
+        _translation_cache = SQLiteCache(
+            TRANSLATION_CACHE_PATH,
+            table="translations",
+            ttl=TRANSLATION_CACHE_TTL,
+            max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+        )
+    return _translation_cache
+
+def normalize_line(line):
+    """Normalize a line for cache lookups (unicode form and whitespace)"""
+    return " ".join(unicodedata.normalize("NFC", line).split())
+
+def translation_cache_key(line, source_lang, target_lang):
+    """Cache key for a single line translation"""
+    return f"{source_lang.upper()}:{target_lang.upper()}:{normalize_line(line)}"
 
 def detect_language_simple(text):
-    """Simple language detection based on common Spanish words"""
-    spanish_words = ['leche', 'huevos', 'pan', 'manzanas', 'pollo', 'arroz', 'queso', 
-                     'yogur', 'tomates', 'cebollas', 'patatas', 'aceite', 'sal',
-                     'litros', 'docena', 'kilo', 'gramos', 'unidades', 'paquete']
-    
-    text_lower = text.lower()
-    spanish_count = sum(1 for word in spanish_words if word in text_lower)
-    
-    if spanish_count > 2:
-        return "es"
-    return "en"
+    """Detect the dominant language of text ("es", "en", ...) from whole-word matches"""
+    return detect_language(text, default="en")[0]
 
-def translate_with_deepl(text):
-    """Translate text using DeepL API"""
+def request_deepl_translations(texts, source_lang='ES', target_lang='EN'):
+    """Send one DeepL request for a list of texts, returns translations or None"""
     try:
         headers = {
             'Authorization': f'DeepL-Auth-Key {DEEPL_API_KEY}',
@@ -33,70 +76,458 @@ def translate_with_deepl(text):
         }
         
         data = {
-            'text': text,
-            'source_lang': 'ES',
-            'target_lang': 'EN'
+            'text': texts,
+            'source_lang': source_lang,
+            'target_lang': target_lang
         }
         
-        response = requests.post(DEEPL_API_URL, headers=headers, data=data)
+        with instrumentation.span("deepl", texts=len(texts)):
+            response = _deepl_session.post(DEEPL_API_URL, headers=headers, data=data, timeout=DEEPL_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
-            return result['translations'][0]['text']
+            return [translation['text'] for translation in result['translations']]
         else:
             print(f"DeepL API error: {response.status_code}")
-            return text  # Return original text if translation fails
+            return None
             
     except Exception as e:
         print(f"Translation error: {e}")
-        return text  # Return original text if translation fails
+        return None
 
-def extract_google_docs_content(doc_url):
-    """Extract content from Google Docs URL"""
-    try:
-        # Convert Google Docs URL to export format
-        if '/edit' in doc_url:
-            export_url = doc_url.replace('/edit', '/export?format=txt')
-        else:
-            export_url = doc_url + '/export?format=txt'
+def _lookup_cached_lines(lines, source_lang, target_lang):
+    """Return (cache, keys, cached translations, {key: line} still to translate)"""
+    cache = get_translation_cache()
+    keys = [translation_cache_key(line, source_lang, target_lang) for line in lines]
+    cached = cache.get_many(keys)
+    
+    # Unique uncached lines, in first-seen order
+    missing = {}
+    for key, line in zip(keys, lines):
+        if key not in cached and key not in missing:
+            missing[key] = normalize_line(line)
+    
+    if missing:
+        print(f"Translation cache: {len(cached)} hits, {len(missing)} lines sent to DeepL")
+    return cache, keys, cached, missing
+
+def translate_lines(lines, source_lang='ES', target_lang='EN'):
+    """Translate lines, serving repeated lines from the translation cache
+    
+    Only lines missing from the cache are sent to DeepL. Lines that fail to
+    translate come back unchanged and are not cached.
+    """
+    cache, keys, cached, missing = _lookup_cached_lines(lines, source_lang, target_lang)
+    
+    if missing:
+        missing_keys = list(missing)
+        fresh = {}
+        for start in range(0, len(missing_keys), DEEPL_MAX_TEXTS_PER_REQUEST):
+            batch_keys = missing_keys[start:start + DEEPL_MAX_TEXTS_PER_REQUEST]
+            translations = request_deepl_translations(
+                [missing[key] for key in batch_keys], source_lang, target_lang
+            )
+            if translations and len(translations) == len(batch_keys):
+                fresh.update(zip(batch_keys, translations))
+        cache.set_many(fresh)
+        cached.update(fresh)
+    
+    return [cached.get(key, line) for key, line in zip(keys, lines)]
+
+def deepl_client():
+    """Shared async HTTP client, with the DeepL concurrency limit applied"""
+    client = get_http_client()
+    client.limit_host(DEEPL_API_URL, DEEPL_BATCH_CONCURRENCY)
+    return client
+
+async def translate_lines_async(lines, source_lang='ES', target_lang='EN', client=None):
+    """translate_lines over the shared async client, DeepL batches sent concurrently"""
+    cache, keys, cached, missing = _lookup_cached_lines(lines, source_lang, target_lang)
+    
+    if missing:
+        client = client or deepl_client()
+        missing_keys = list(missing)
         
-        response = requests.get(export_url, timeout=30)
+        async def run_batch(indices):
+            batch_keys = [missing_keys[i] for i in indices]
+            try:
+                translations, _ = await request_deepl_translations_async(
+                    client, [missing[key] for key in batch_keys], source_lang, target_lang
+                )
+            except Exception as e:
+                print(f"Translation error: {e}")
+                return {}
+            if translations and len(translations) == len(batch_keys):
+                return dict(zip(batch_keys, translations))
+            return {}
         
-        if response.status_code == 200:
-            return {
-                "success": True,
-                "content": response.text
-            }
-        else:
-            return {
-                "success": False,
-                "error": f"Failed to fetch: {response.status_code}"
-            }
-            
+        fresh = {}
+        for batch in await asyncio.gather(*(run_batch(indices) for indices in pack_deepl_batches(list(missing.values())))):
+            fresh.update(batch)
+        cache.set_many(fresh)
+        cached.update(fresh)
+    
+    return [cached.get(key, line) for key, line in zip(keys, lines)]
+
+def split_translatable_lines(text, source_lang='ES', target_lang='EN'):
+    """Split text into lines and return (lines, positions of lines to translate)
+    
+    Blank lines and lines already in the target language are left out.
+    """
+    lines = text.split('\n')
+    positions = [
+        i for i, line in enumerate(lines)
+        if line.strip() and needs_translation(line, target_lang.lower(), default=source_lang.lower())
+    ]
+    return lines, positions
+
+def splice_translations(lines, positions, translations):
+    """Put translated lines back, keeping each line's surrounding whitespace"""
+    lines = list(lines)
+    for i, translation in zip(positions, translations):
+        line = lines[i]
+        leading = line[:len(line) - len(line.lstrip())]
+        trailing = line[len(line.rstrip()):]
+        lines[i] = f"{leading}{translation}{trailing}"
+    return '\n'.join(lines)
+
+def translate_with_deepl(text, source_lang='ES', target_lang='EN'):
+    """Translate text using DeepL API, one cached line at a time
+    
+    Lines already in the target language are not sent.
+    """
+    lines, positions = split_translatable_lines(text, source_lang, target_lang)
+    if not positions:
+        return text
+    
+    translated = translate_lines([lines[i].strip() for i in positions], source_lang, target_lang)
+    return splice_translations(lines, positions, translated)
+
+def translate_document_selectively(text, target_lang='EN', default_source=None):
+    """Translate only the lines of a document that are not in the target language
+    
+    Every line is classified on its own; lines without recognised words
+    take the document's language (or default_source). List markers such
+    as "1. " stay out of the text sent to DeepL, so the same entry shares
+    one cached translation whatever its number. Lines are grouped by
+    source language, deduplicated, translated and spliced back in order.
+    Returns (translated_text, stats).
+    """
+    lines, groups, default_source = _group_lines_by_language(text, target_lang, default_source)
+    characters = _uncached_characters(groups, target_lang)
+    translations = {
+        language: translate_lines([body for _, _, body in entries], language.upper(), target_lang)
+        for language, entries in groups.items()
+    }
+    return _splice_selective(lines, groups, translations, default_source, characters)
+
+async def translate_document_selectively_async(text, target_lang='EN', default_source=None, client=None):
+    """translate_document_selectively over the shared async client, languages translated concurrently"""
+    lines, groups, default_source = _group_lines_by_language(text, target_lang, default_source)
+    characters = _uncached_characters(groups, target_lang)
+    results = await asyncio.gather(*(
+        translate_lines_async([body for _, _, body in entries], language.upper(), target_lang, client)
+        for language, entries in groups.items()
+    ))
+    return _splice_selective(lines, groups, dict(zip(groups, results)), default_source, characters)
+
+def _group_lines_by_language(text, target_lang, default_source):
+    """Return (lines, {language: [(position, marker, body)]}, default_source) for lines to translate"""
+    target = target_lang.lower()
+    if default_source is None:
+        default_source = detect_language(text, default=target)[0]
+    default_source = default_source.lower()
+    
+    lines = text.split('\n')
+    groups = {}
+    for i, line in enumerate(lines):
+        marker, body = split_list_marker(line.strip())
+        if not body or not has_words(body):
+            continue
+        language = detect_line_language(body, default=default_source)
+        if language != target:
+            groups.setdefault(language, []).append((i, marker, body))
+    return lines, groups, default_source
+
+def _uncached_characters(groups, target_lang):
+    """Characters of the unique lines the translation cache cannot serve, i.e. what DeepL will bill"""
+    cache = get_translation_cache()
+    characters = 0
+    for language, entries in groups.items():
+        unique = {translation_cache_key(body, language, target_lang): normalize_line(body) for _, _, body in entries}
+        cached = cache.get_many(list(unique))
+        characters += sum(len(line) for key, line in unique.items() if key not in cached)
+    return characters
+
+def _splice_selective(lines, groups, translations, default_source, characters):
+    """Put each group's translations back in place, returns (translated_text, stats)
+
+    characters is what was sent to DeepL, from _uncached_characters.
+    """
+    translated = {}
+    unique_texts = 0
+    for language, entries in groups.items():
+        unique_texts += len({normalize_line(body) for _, _, body in entries})
+        for (i, marker, _), translation in zip(entries, translations[language]):
+            translated[i] = marker + translation
+    
+    positions = sorted(translated)
+    stats = {
+        "document_language": default_source,
+        "lines": sum(1 for line in lines if line.strip()),
+        "translated_lines": len(positions),
+        "unique_texts": unique_texts,
+        "characters": characters,
+        "languages": {language: len(entries) for language, entries in groups.items()},
+    }
+    return splice_translations(lines, positions, [translated[i] for i in positions]), stats
+
+def pack_deepl_batches(texts, max_texts=DEEPL_MAX_TEXTS_PER_REQUEST, max_bytes=DEEPL_MAX_REQUEST_BYTES):
+    """Group text indices into DeepL requests under the text count and payload limits"""
+    batches = []
+    current = []
+    current_bytes = 0
+    
+    for index, text in enumerate(texts):
+        # Form encoding roughly triples non-ASCII bytes, stay on the safe side
+        size = len(text.encode('utf-8')) * 3 + len('&text=')
+        if current and (len(current) >= max_texts or current_bytes + size > max_bytes):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(index)
+        current_bytes += size
+    
+    if current:
+        batches.append(current)
+    return batches
+
+async def request_deepl_translations_async(client, texts, source_lang='ES', target_lang='EN', api_url=None):
+    """Async counterpart of request_deepl_translations using a shared client"""
+    headers = {'Authorization': f'DeepL-Auth-Key {DEEPL_API_KEY}'}
+    data = [('text', text) for text in texts]
+    data += [('source_lang', source_lang), ('target_lang', target_lang)]
+    
+    with instrumentation.span("deepl", texts=len(texts)):
+        response = await client.post(api_url or DEEPL_API_URL, headers=headers, data=data, timeout=DEEPL_TIMEOUT)
+    if response.status != 200:
+        print(f"DeepL API error: {response.status}")
+        return None, response.attempts
+    
+    translations = [translation['text'] for translation in response.json()['translations']]
+    return translations, response.attempts
+
+async def translate_lists_batch(lists, source_lang='ES', target_lang='EN', concurrency=DEEPL_BATCH_CONCURRENCY,
+                                client=None, api_url=None, use_cache=True):
+    """Translate many grocery lists at once
+    
+    Unique uncached lines from every list are packed into multi-text DeepL
+    requests, sent with bounded concurrency over the shared client, and the
+    results are spliced back into each list in order. Returns a dict with
+    the translated lists and per-batch throughput stats.
+    """
+    started = time.perf_counter()
+    split = [split_translatable_lines(text, source_lang, target_lang) for text in lists]
+    
+    # Deduplicate lines across every list
+    keys_per_list = []
+    unique = {}
+    for lines, positions in split:
+        keys = []
+        for i in positions:
+            key = translation_cache_key(lines[i], source_lang, target_lang)
+            keys.append(key)
+            unique.setdefault(key, normalize_line(lines[i]))
+        keys_per_list.append(keys)
+    
+    cache = get_translation_cache() if use_cache else None
+    translated = cache.get_many(unique) if cache is not None else {}
+    missing_keys = [key for key in unique if key not in translated]
+    batches = pack_deepl_batches([unique[key] for key in missing_keys])
+    
+    if client is None:
+        client = get_http_client()
+        client.limit_host(api_url or DEEPL_API_URL, concurrency)
+    
+    async def run_batch(number, indices):
+        batch_keys = [missing_keys[i] for i in indices]
+        texts = [unique[key] for key in batch_keys]
+        batch_started = time.perf_counter()
+        try:
+            translations, attempts = await request_deepl_translations_async(
+                client, texts, source_lang, target_lang, api_url
+            )
+        except Exception as e:
+            print(f"Translation error in batch {number}: {e}")
+            translations, attempts = None, client.max_retries + 1
+        elapsed = time.perf_counter() - batch_started
+        
+        success = bool(translations) and len(translations) == len(batch_keys)
+        if success:
+            translated.update(zip(batch_keys, translations))
+            if cache is not None:
+                cache.set_many(dict(zip(batch_keys, translations)))
+        
+        chars = sum(len(text) for text in texts)
+        return {
+            "batch": number,
+            "success": success,
+            "texts": len(texts),
+            "characters": chars,
+            "attempts": attempts,
+            "seconds": elapsed,
+            "characters_per_second": chars / elapsed if elapsed > 0 else 0.0,
+        }
+    
+    batch_stats = await asyncio.gather(*(run_batch(n, indices) for n, indices in enumerate(batches)))
+    
+    results = []
+    for (lines, positions), keys in zip(split, keys_per_list):
+        translations = [translated.get(key, lines[i].strip()) for key, i in zip(keys, positions)]
+        results.append(splice_translations(lines, positions, translations))
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "translations": results,
+        "batches": list(batch_stats),
+        "stats": {
+            "lists": len(lists),
+            "unique_lines": len(unique),
+            "cache_hits": len(unique) - len(missing_keys),
+            "requests": len(batches),
+            "failed_batches": sum(1 for stat in batch_stats if not stat["success"]),
+            "seconds": elapsed,
+            "lists_per_second": len(lists) / elapsed if elapsed > 0 else 0.0,
+        },
+    }
+
+def google_docs_export_url(doc_url):
+    """Plain-text export URL for a Google Docs document URL"""
+    if '/edit' in doc_url:
+        return doc_url.replace('/edit', '/export?format=txt')
+    return doc_url + '/export?format=txt'
+
+def get_document_cache():
+    """Return the on-disk cache of fetched documents and their processed output"""
+    global _document_cache
+    if _document_cache is None:
+        _document_cache = SQLiteCache(
+            TRANSLATION_CACHE_PATH,
+            table="documents",
+            max_entries=DOCUMENT_CACHE_MAX_ENTRIES,
+        )
+    return _document_cache
+
+def content_hash(content):
+    """Stable hash of a document's text"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def _conditional_request(doc_url, use_cache):
+    """Return (export_url, cache, previous entry, request headers) for a document fetch"""
+    export_url = google_docs_export_url(doc_url)
+    cache = get_document_cache() if use_cache else None
+    previous = cache.get(export_url) if cache is not None else None
+    
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    return export_url, cache, previous, headers
+
+def _document_result(export_url, cache, previous, status, headers, content):
+    """Turn a document response into the extract_google_docs_content result"""
+    if status == 304 and previous:
+        return {
+            "success": True,
+            "content": previous["content"],
+            "content_hash": previous["content_hash"],
+            "unchanged": True
+        }
+    elif status == 200:
+        digest = content_hash(content)
+        unchanged = bool(previous) and previous.get("content_hash") == digest
+        if cache is not None:
+            entry = dict(previous) if unchanged else {}
+            entry.update({
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "content_hash": digest,
+                "content": content,
+            })
+            cache.set(export_url, entry)
+        return {
+            "success": True,
+            "content": content,
+            "content_hash": digest,
+            "unchanged": unchanged
+        }
+    else:
+        return {
+            "success": False,
+            "error": f"Failed to fetch: {status}"
+        }
+
+def extract_google_docs_content(doc_url, use_cache=True):
+    """Extract content from Google Docs URL
+    
+    Sends the ETag / Last-Modified validators from the previous fetch, so
+    an unchanged document costs a 304 instead of a full download. The
+    result has "unchanged": True when the server answered 304 or the
+    downloaded text hashes the same as last time.
+    """
+    try:
+        export_url, cache, previous, headers = _conditional_request(doc_url, use_cache)
+        response = _docs_session.get(export_url, headers=headers, timeout=DOCS_TIMEOUT)
+        return _document_result(export_url, cache, previous, response.status_code, response.headers, response.text)
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
-def extract_grocery_items_with_quantities(text):
-    """Extract grocery items with quantities from text"""
-    items = []
-    lines = text.split('\n')
+async def extract_google_docs_content_async(doc_url, use_cache=True, client=None):
+    """extract_google_docs_content over the shared async client"""
+    try:
+        export_url, cache, previous, headers = _conditional_request(doc_url, use_cache)
+        response = await (client or get_http_client()).get(export_url, headers=headers, timeout=DOCS_TIMEOUT)
+        return _document_result(export_url, cache, previous, response.status, response.headers, response.text)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def get_processed_document(doc_url, digest):
+    """Output stored for this exact document content by remember_processed_document, or None"""
+    entry = get_document_cache().get(google_docs_export_url(doc_url))
+    if entry and entry.get("content_hash") == digest and "processed" in entry:
+        return entry["processed"]
+    return None
+
+def remember_processed_document(doc_url, digest, processed):
+    """Store the downstream output (translated text, items) for a fetched document"""
+    cache = get_document_cache()
+    export_url = google_docs_export_url(doc_url)
+    entry = cache.get(export_url)
+    if entry and entry.get("content_hash") == digest:
+        entry["processed"] = processed
+        cache.set(export_url, entry)
+
+def extract_grocery_items_with_quantities(text, default=DEFAULT_GROCERY_ITEMS):
+    """Extract grocery items with quantities from text
     
-    for line in lines:
-        line = line.strip()
-        if line and not line.startswith('Shopping List') and not line.startswith('Grocery'):
-            # Extract item with quantity
-            if '. ' in line:
-                item = line.split('. ', 1)[1]  # Remove numbering
-                if item and item not in ['', ' ']:
-                    items.append(item.strip())
+    A text without list entries gives a copy of default, or an empty list
+    when default is None.
+    """
+    # Keep each entry's text ("Milk - 2 liters"), without its list marker
+    items = [record.text for record in iter_grocery_lines(text.splitlines(), require_marker=True)]
     
-    return items if items else ['milk', 'eggs', 'bread']
+    return items if items or default is None else list(default)
 
-def translate_spanish_to_english():
-    """Translate Spanish grocery list to English"""
+def translate_spanish_to_english(list_id=DEFAULT_LIST_ID):
+    """Translate Spanish grocery list to English and save it to the list store"""
     try:
         # Read Spanish list
         with open('lista_compras_espanol.txt', 'r', encoding='utf-8') as f:
@@ -106,8 +537,8 @@ def translate_spanish_to_english():
         english_text = translate_with_deepl(spanish_text)
         
         # Save English list
-        with open('grocery_list_english.txt', 'w', encoding='utf-8') as f:
-            f.write(english_text)
+        items = [record.text for record in iter_grocery_lines(english_text.splitlines(), require_marker=True)]
+        get_list_store().save_list(list_id, items, source='lista_compras_espanol.txt', document=english_text)
         
         print("Translation completed!")
         
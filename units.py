@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit normalization for grocery quantities
+Maps unit spellings (English and Spanish) to a dimension and a factor
+to that dimension's base unit: milliliters, grams or items. Packaging
+units (loaf, can, bottle, ...) are each a dimension of their own. This
+is the one unit vocabulary; the line parser recognises the same names
+"""
+
+VOLUME = "volume"  # base unit: ml
+MASS = "mass"  # base unit: g
+COUNT = "count"  # base unit: items
+
+_UNITS = {
+    VOLUME: {
+        1.0: "ml milliliter milliliters millilitre millilitres mililitro mililitros",
+        1000.0: "l lt liter liters litre litres litro litros",
+        3785.41: "gal gallon gallons galon galones",
+        946.353: "qt quart quarts",
+        473.176: "pt pint pints",
+        236.588: "cup cups taza tazas",
+        29.5735: "floz fl.oz",
+        14.7868: "tbsp tablespoon tablespoons",
+        4.92892: "tsp teaspoon teaspoons",
+    },
+    MASS: {
+        1.0: "g gr gram grams gramo gramos",
+        1000.0: "kg kgs kilo kilos kilogram kilograms kilogramo kilogramos",
+        453.592: "lb lbs pound pounds libra libras",
+        28.3495: "oz ounce ounces onza onzas",
+    },
+    COUNT: {
+        1.0: "unit units unidad unidades item items piece pieces pcs ct count x",
+        12.0: "dozen dozens docena docenas",
+    },
+}
+
+# Loaves add up with loaves but never with cans, so each gets its own dimension
+_PACKAGES = {
+    "pack": "pack packs package packages paquete paquetes",
+    "bag": "bag bags bolsa bolsas",
+    "box": "box boxes caja cajas",
+    "can": "can cans lata latas",
+    "bottle": "bottle bottles botella botellas",
+    "jar": "jar jars frasco frascos",
+    "loaf": "loaf loaves barra barras",
+    "bunch": "bunch bunches manojo manojos",
+}
+
+UNIT_FACTORS = {
+    unit: (dimension, factor)
+    for dimension, factors in _UNITS.items()
+    for factor, names in factors.items()
+    for unit in names.split()
+}
+UNIT_FACTORS.update(
+    (unit, (dimension, 1.0))
+    for dimension, names in _PACKAGES.items()
+    for unit in names.split()
+)
+
+
+def unit_info(unit):
+    """Return (dimension, factor to base unit) for a unit, or None if unknown"""
+    if not unit:
+        return COUNT, 1.0
+    return UNIT_FACTORS.get(unit.lower().rstrip('.'))
+
+
+def to_base(quantity, unit):
+    """Convert a quantity to its base unit, returns (dimension, amount) or None"""
+    if quantity is None:
+        return None
+    info = unit_info(unit)
+    if info is None:
+        return None
+    dimension, factor = info
+    return dimension, quantity * factor